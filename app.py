@@ -3,23 +3,16 @@ Web界面 - A股两融交易查询系统
 基于Streamlit的Web应用程序
 """
 
-from margin.visualizer import create_margin_visualizer
-from margin.processor import create_margin_processor
-from margin.fetcher import create_margin_fetcher
-from utils import setup_logging, ensure_directories, format_number
-from config import MARGIN_TRADING_CONFIG
+from utils import setup_logging, ensure_directories
+from config import MARGIN_TRADING_CONFIG, SECTOR_CONFIG, ETF_CONFIG, index_stock_top_n
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+import io
 import os
-import sys
-
-# 添加当前目录到Python路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import re
+import uuid
 
 
 # 页面配置
@@ -31,7 +24,7 @@ st.set_page_config(
 )
 
 # 自定义CSS样式
-st.markdown("""
+_CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -103,6 +96,11 @@ st.markdown("""
     .neutral-value {
         color: #666 !important;
     }
+    .feature-grid {
+        display: grid;
+        grid-template-columns: repeat(3, 1fr);
+        gap: 1rem;
+    }
     /* 数据表格样式 */
     .stDataFrame {
         font-size: 0.9rem;
@@ -116,8 +114,1006 @@ st.markdown("""
         background: linear-gradient(135deg, #e6ffe6 0%, #ccffcc 100%);
         border-left: 4px solid #00C851;
     }
+    .metric-row {
+        display: grid;
+        grid-template-columns: repeat(4, 1fr);
+        gap: 1rem;
+    }
+    .metric-label {
+        font-size: 0.9rem;
+        color: #666;
+    }
+    .metric-value {
+        font-size: 1.6rem;
+        font-weight: bold;
+    }
+    .metric-delta {
+        font-size: 0.85rem;
+        color: #666;
+    }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# 每次重新运行都需要重新输出样式，否则Streamlit会把上一轮未输出的元素移除
+st.markdown(_CUSTOM_CSS, unsafe_allow_html=True)
+
+
+# 主页静态内容
+_MAIN_PAGE_HEADER_HTML = """
+<div class="main-header">📊 A股金融数据分析系统</div>
+<div class="info-box">
+    <h3>🎯 欢迎使用A股金融数据分析系统</h3>
+    <p>📈 本系统提供专业的A股市场数据分析功能，帮助投资者做出更明智的投资决策</p>
+    <p>🚀 支持两融交易分析和ETF基金分析，数据实时更新，图表直观易懂</p>
+</div>
+"""
+
+_MAIN_FEATURE_CARDS_HTML = """
+<div class="feature-grid">
+    <div class="feature-card">
+        <div class="feature-icon">📈</div>
+        <div class="feature-title">两融交易查询</div>
+        <div class="feature-description">查询和分析A股市场的融资融券交易数据，包括余额趋势、占比分析等</div>
+    </div>
+    <div class="feature-card">
+        <div class="feature-icon">💰</div>
+        <div class="feature-title">ETF基金查询</div>
+        <div class="feature-description">查询和分析ETF基金的资金流向、份额变动、申购赎回情况</div>
+    </div>
+    <div class="feature-card">
+        <div class="feature-icon">🏢</div>
+        <div class="feature-title">板块资金查询</div>
+        <div class="feature-description">查询和分析中国股市各板块的资金流向情况，包括主力资金、涨跌幅等</div>
+    </div>
+</div>
+"""
+
+
+# 常用ETF代码及名称
+_ETF_NAME_MAP = {
+    '510310': '沪深300ETF',
+    '510050': '上证50ETF',
+    '510500': '中证500ETF',
+    '159919': '沪深300ETF',
+    '159915': '创业板ETF',
+    '512100': '中证1000ETF'
+}
+
+# 页面说明文字存放在assets目录下的Markdown文件中
+_ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+
+@st.cache_data(show_spinner=False)
+def _load_md(name: str) -> str:
+    """
+    读取assets目录下的Markdown说明文件（缓存后重新运行时不再读取文件）
+    :param name: 文件名
+    :return: Markdown文本
+    """
+    with open(os.path.join(_ASSETS_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+# 切换页面时需要清除的各模块session state键
+_MARGIN_STATE_KEYS = ('processed_data', 'processed_data_version', 'analysis_result')
+_ETF_STATE_KEYS = ('etf_data', 'current_etf_code', 'last_etf_query_key')
+_SECTOR_STATE_KEYS = ('sector_data', 'sector_analysis',
+                      'current_sector', 'sector_detail_data',
+                      'index_sector_detail_data', 'current_index_code',
+                      'sector_history_data', 'sector_history_analysis',
+                      'sector_current_analysis')
+
+
+# 数值涨跌颜色（中国股市习惯：红涨绿跌），按数值符号(1/-1/0)查表得到样式类和正号；
+# 符号需先转为int再相减，numpy标量比较得到的np.bool_不支持减法
+_COLOR_SIGN_LUT = {
+    1: ("positive-value", "+"),
+    -1: ("negative-value", ""),
+    0: ("neutral-value", "")
+}
+_SPAN_NUMBER = '<span class="{0}">{1}{2:.2f}</span>'
+_SPAN_PERCENT = '<span class="{0}">{1}{2:.2f}%</span>'
+_SPAN_MONEY = '<span class="{0}">{1}{2:.2f}{3}</span>'
+
+# 指标卡片按数值符号(1/-1/0)选择卡片底色
+_METRIC_TONE_LUT = {
+    1: " metric-positive",
+    -1: " metric-negative",
+    0: ""
+}
+_METRIC_CARD = ('<div class="metric-container{0}"><div class="metric-label">{1}</div>'
+                '<div class="metric-value">{2}</div>{3}</div>')
+_METRIC_DELTA = '<div class="metric-delta">{0}</div>'
+
+
+def _metric_tone(value: float) -> str:
+    """
+    根据数值符号获取指标卡片样式（红涨绿跌）
+    :param value: 数值
+    :return: 卡片附加样式类
+    """
+    return _METRIC_TONE_LUT[int(value > 0) - int(value < 0)]
+
+
+@st.cache_data(show_spinner=False)
+def _metric_cards_html(cards: tuple) -> str:
+    """
+    将一行指标卡片拼成一个HTML块，用一次markdown输出（带缓存，指标不变时直接复用）
+    :param cards: (样式, 标签, 数值, 变化)元组序列，变化为空字符串时不显示
+    :return: HTML字符串
+    """
+    items = ''.join(
+        _METRIC_CARD.format(tone, label, value, _METRIC_DELTA.format(delta) if delta else '')
+        for tone, label, value, delta in cards)
+    return f'<div class="metric-row">{items}</div>'
+
+
+# 数据获取器持有requests.Session连接池，在进程内共享但设置生存时间，
+# 长时间运行时定期重建，不会一直复用同一个HTTP会话
+_FETCHER_TTL = 3600
+
+
+# 两融组件：数据获取器持有requests.Session连接池，在进程内只创建一次，
+# 各会话和重新运行之间复用
+@st.cache_resource(ttl=_FETCHER_TTL, show_spinner=False)
+def _get_margin_fetcher():
+    """获取两融数据获取器（进程内共享）"""
+    from margin.fetcher import create_margin_fetcher
+    return create_margin_fetcher()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_margin_processor():
+    """获取两融数据处理器（进程内共享）"""
+    from margin.processor import create_margin_processor
+    return create_margin_processor()
+
+
+# 板块组件：首次使用时才导入对应模块，实例在进程内只创建一次，
+# 重新运行之间复用（板块获取器内部的指数信息缓存也因此得以生效）
+@st.cache_resource(ttl=_FETCHER_TTL, show_spinner=False)
+def _get_sector_fetcher():
+    """获取板块数据获取器（进程内共享）"""
+    from sector.fetcher import create_sector_fetcher
+    return create_sector_fetcher()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_sector_processor():
+    """获取板块数据处理器（进程内共享）"""
+    from sector.processor import create_sector_processor
+    return create_sector_processor()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_sector_visualizer():
+    """获取板块可视化器（进程内共享）"""
+    from sector.visualizer import create_sector_visualizer
+    return create_sector_visualizer()
+
+
+# ETF组件：与板块组件相同，首次使用时导入，进程内只创建一次
+@st.cache_resource(ttl=_FETCHER_TTL, show_spinner=False)
+def _get_etf_fetcher():
+    """获取ETF数据获取器（进程内共享）"""
+    from etf.fetcher import create_etf_fetcher
+    return create_etf_fetcher()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_etf_processor():
+    """获取ETF数据处理器（进程内共享）"""
+    from etf.processor import create_etf_processor
+    return create_etf_processor()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_etf_visualizer():
+    """获取ETF可视化器（进程内共享）"""
+    from etf.visualizer import create_etf_visualizer
+    return create_etf_visualizer()
+
+
+# ETF图表缓存：查询结果不变时重新运行直接复用已构建的图表
+@st.cache_data(ttl=ETF_CONFIG['cache_duration'], show_spinner=False)
+def _build_etf_comprehensive_fig(fund_flow_data: pd.DataFrame,
+                                 share_change_data: pd.DataFrame,
+                                 outside_data: pd.DataFrame):
+    """构建ETF综合分析图（带缓存）"""
+    return _get_etf_visualizer().create_comprehensive_etf_chart(
+        fund_flow_data, share_change_data, outside_data)
+
+
+@st.cache_data(ttl=ETF_CONFIG['cache_duration'], show_spinner=False)
+def _build_etf_net_inflow_fig(fund_flow_data: pd.DataFrame):
+    """构建ETF净流入趋势图（带缓存）"""
+    return _get_etf_visualizer().create_net_inflow_chart(fund_flow_data)
+
+
+@st.cache_data(ttl=ETF_CONFIG['cache_duration'], show_spinner=False)
+def _build_etf_price_trend_fig(outside_data: pd.DataFrame):
+    """构建ETF价格趋势图（带缓存）"""
+    return _get_etf_visualizer().create_price_trend_chart(outside_data)
+
+
+@st.cache_data(ttl=ETF_CONFIG['cache_duration'], show_spinner=False)
+def _build_etf_price_change_fig(outside_data: pd.DataFrame):
+    """构建ETF涨跌幅图（带缓存）"""
+    return _get_etf_visualizer().create_price_change_chart(outside_data)
+
+
+# 板块数据缓存：相同参数的重复查询在缓存有效期内直接返回，不再重复请求网络和计算
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _fetch_sector_fund_flow() -> pd.DataFrame:
+    """获取板块资金流向数据（带缓存）"""
+    return _get_sector_fetcher().get_sector_fund_flow()
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _fetch_sector_data_by_index(index_code: str) -> pd.DataFrame:
+    """获取指数板块成分股数据（带缓存）"""
+    return _get_sector_fetcher().get_sector_data_by_index(index_code)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _fetch_sector_history_by_index(index_code: str, days: int) -> pd.DataFrame:
+    """获取指数板块历史数据（带缓存）"""
+    return _get_sector_fetcher().get_sector_history_by_index(index_code, days)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _fetch_sector_detail(sector_name: str) -> pd.DataFrame:
+    """获取板块详细资金数据（带缓存）"""
+    return _get_sector_fetcher().get_sector_detail(sector_name)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _process_sector_data(sector_data: pd.DataFrame) -> dict:
+    """处理板块资金流向数据（带缓存）"""
+    return _get_sector_processor().process_sector_data(sector_data)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _analyze_index_sector_detail(index_code: str, sector_data: pd.DataFrame) -> dict:
+    """分析指数板块详情（带缓存）"""
+    return _get_sector_processor().analyze_index_sector_detail(index_code, sector_data)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _analyze_sector_history(history_data: pd.DataFrame) -> dict:
+    """分析板块历史数据（带缓存）"""
+    return _get_sector_processor().analyze_sector_history(history_data)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _analyze_sector_detail(sector_name: str, detail_data: pd.DataFrame) -> dict:
+    """分析板块详情（带缓存）"""
+    return _get_sector_processor().analyze_sector_detail(sector_name, detail_data)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _build_sentiment_gauge(score: float):
+    """
+    构建市场情绪仪表盘（带缓存，仪表盘只取决于情绪评分）
+    :param score: 情绪评分
+    :return: 图表对象
+    """
+    return _get_sector_visualizer().create_market_sentiment_gauge(
+        {'market_sentiment': {'情绪评分': score}})
+
+
+# 板块图表缓存：输入数据不变时重新运行直接复用已构建的图表，不再重复构建Plotly图形
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _build_sector_overview_fig(raw_data: pd.DataFrame):
+    """构建板块资金流向概览图（带缓存）"""
+    return _get_sector_visualizer().create_sector_overview_chart({'raw_data': raw_data})
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _build_sector_ranking_fig(rankings: dict, chart_type: str):
+    """构建板块排行图（带缓存）"""
+    return _get_sector_visualizer().create_sector_ranking_chart(
+        {'rankings': rankings}, chart_type)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _build_index_sector_fig(analysis_result: dict):
+    """构建指数板块权重股分析图（带缓存）"""
+    return _get_sector_visualizer().create_index_sector_chart(analysis_result)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _build_sector_history_fig(history_data: pd.DataFrame, history_analysis: dict):
+    """构建板块历史趋势图（带缓存）"""
+    return _get_sector_visualizer().create_sector_history_chart(
+        history_data, history_analysis)
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _build_sector_detail_fig(detail_data: dict):
+    """构建板块详细分析图（带缓存）"""
+    return _get_sector_visualizer().create_sector_detail_chart(detail_data)
+
+
+# 两融数据缓存：相同日期范围的重复查询直接命中缓存，不再重复请求网络和计算
+# 以下划线开头的参数不参与缓存键计算
+# 取消“使用缓存数据”时查询方法直接调用数据获取器，不经过这两层缓存
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'], show_spinner=False)
+def _fetch_margin_summary(_data_fetcher, start_date: str, end_date: str) -> pd.DataFrame:
+    """获取两融汇总数据（带缓存）"""
+    return _data_fetcher.get_margin_trading_summary(start_date, end_date)
+
+
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'], show_spinner=False)
+def _fetch_market_turnover(_data_fetcher, start_date: str, end_date: str) -> pd.DataFrame:
+    """获取市场成交金额数据（带缓存）"""
+    return _data_fetcher.get_market_turnover(start_date, end_date)
+
+
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'], show_spinner=False)
+def _process_margin_summary(_data_processor, margin_data: pd.DataFrame,
+                            market_data: pd.DataFrame) -> pd.DataFrame:
+    """处理两融汇总数据（带缓存）"""
+    return _data_processor.process_margin_summary(margin_data, market_data)
+
+
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'], show_spinner=False)
+def _analyze_margin_trends(_data_processor, processed_data: pd.DataFrame) -> dict:
+    """分析两融趋势（带缓存）"""
+    return _data_processor.analyze_margin_trends(processed_data)
+
+
+def _margin_dates(df: pd.DataFrame):
+    """获取两融数据的横轴日期"""
+    # 交易日期在数据处理阶段已转换为datetime64，这里直接取底层数组，
+    # 避免每次重新运行都重复解析日期
+    return df['交易日期'].to_numpy() if '交易日期' in df.columns else list(range(len(df)))
+
+
+def _nan_stats(values: np.ndarray):
+    """
+    计算数组的均值、最小值、最大值（忽略NaN）
+    :param values: 数值数组
+    :return: (均值, 最小值, 最大值)
+    """
+    # 先剔除NaN一次，之后的三个归约都在同一块连续内存上完成
+    valid = values[~np.isnan(values)]
+    if valid.size == 0:
+        return np.nan, np.nan, np.nan
+    return valid.mean(), valid.min(), valid.max()
+
+
+def _nan_column_stats(values: np.ndarray):
+    """
+    按列计算二维数组的均值、最小值、最大值（忽略NaN），多列在同一块内存上一次归约
+    :param values: 二维数值数组，每列一个变量
+    :return: (均值数组, 最小值数组, 最大值数组)
+    """
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(valid, values, 0.0).sum(axis=0) / counts
+    empty = counts == 0
+    mins = np.where(valid, values, np.inf).min(axis=0, initial=np.inf)
+    maxs = np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf)
+    return means, np.where(empty, np.nan, mins), np.where(empty, np.nan, maxs)
+
+
+def _nan_corr(values: np.ndarray) -> np.ndarray:
+    """
+    计算各列之间的皮尔逊相关系数矩阵（按列对剔除NaN，与DataFrame.corr一致）
+    :param values: 二维数值数组，每列一个变量
+    :return: 相关系数矩阵
+    """
+    valid = ~np.isnan(values)
+    mask = valid.astype(np.float64)
+    # 先按列去均值：平移不改变相关系数，但可避免大数值平方求和的精度损失
+    x = np.where(valid, values - np.nanmean(values, axis=0), 0.0)
+
+    # 以矩阵乘法一次求出所有列对的样本数和各阶和，[i, j]只统计两列同时有效的行
+    n = mask.T @ mask
+    sum_x = x.T @ mask
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x ** 2 / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _downsample(x, y: np.ndarray, max_points: int):
+    """
+    使用LTTB（最大三角形三桶）算法对曲线降采样，保留峰谷形状的同时控制传给浏览器的数据点数
+    :param x: 横轴数据
+    :param y: 纵轴数值数组
+    :param max_points: 最大点数，0表示不降采样
+    :return: (降采样后的横轴, 降采样后的纵轴)
+    """
+    n = len(y)
+    if not max_points or n <= max_points:
+        return x, y
+
+    # 首尾两点固定保留，中间数据均分为n_buckets个桶，每桶选出一个点；
+    # 横轴按数据序号计算（交易日等间隔），缺失值不参与桶均值
+    n_buckets = max(max_points, 3) - 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.intp)
+    starts = edges[:-1]
+    valid = ~np.isnan(y)
+    sums = np.add.reduceat(np.where(valid, y, 0.0), starts)
+    counts = np.add.reduceat(valid.astype(np.intp), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_y = sums / counts
+    avg_t = (edges[:-1] + edges[1:] - 1) / 2.0
+
+    selected = np.empty(n_buckets + 2, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_buckets):
+        start, end = edges[i], edges[i + 1]
+        # 三角形第三个顶点取下一个桶的均值点（最后一个桶取末尾点）
+        if i + 1 < n_buckets:
+            next_t, next_y = avg_t[i + 1], avg_y[i + 1]
+        else:
+            next_t, next_y = n - 1, y[n - 1]
+        area = np.abs((prev - next_t) * (y[start:end] - y[prev])
+                      - (prev - np.arange(start, end)) * (next_y - y[prev]))
+        prev = start + int(np.argmax(np.where(np.isnan(area), -1.0, area)))
+        selected[i + 1] = prev
+
+    return np.asarray(x)[selected], y[selected]
+
+
+# 板块详情汇总指标：(数据键, 指标标题, 缺省值)
+_SECTOR_DETAIL_SUMMARY_METRICS = (
+    ('成分股数量', "📊 成分股数量", 0),
+    ('板块总资金净流入', "💰 板块总资金净流入", '0.00万元'),
+    ('平均涨跌幅', "📈 平均涨跌幅", '0.00%'),
+    ('上涨比例', "📊 上涨比例", '0.0%'),
+)
+
+# 板块强度分析指标：(数据键, 指标标题, 缺省值)
+_SECTOR_STRENGTH_METRICS = (
+    ('板块强度', "🏆 板块强度", 'N/A'),
+    ('涨停股数量', "🚀 涨停股数量", 0),
+    ('龙头效应', "🎯 龙头效应", 'N/A'),
+)
+
+
+# 板块排行榜选项卡：(排行图类型, 榜单数据键, 选项卡标题, 榜单为空时的提示)
+_SECTOR_RANKING_TABS = (
+    ('inflow', '资金流入榜', "💰 资金流入榜",
+     ("📊 当前市场中没有资金净流入的板块",
+      ("市场整体处于资金流出状态", "所有板块都在下跌或调整中", "建议查看资金流出榜了解市场情况"))),
+    ('outflow', '资金流出榜', "📉 资金流出榜",
+     ("📊 当前市场中没有资金净流出的板块",
+      ("市场整体处于资金流入状态", "所有板块都在上涨或反弹中", "建议查看资金流入榜了解热门板块"))),
+    ('rising', '涨幅榜', "📈 涨幅榜", None),
+    ('falling', '跌幅榜', "📊 跌幅榜", None),
+)
+
+
+# 板块排行榜数值列的显示格式：数据保持数值类型由前端格式化，表格可按数值排序
+_RANKING_COLUMN_CONFIG = {
+    '主力资金': st.column_config.NumberColumn(format="%+.2f亿"),
+    '涨跌幅': st.column_config.NumberColumn(format="%+.2f%%")
+}
+
+
+# 成分股表格数值列：原列名 -> (显示列名, 换算倍数)，显示列名与原列名相同时原位格式化
+_STOCK_RANKING_COLUMNS = {
+    '最新价': ('最新价', 1),
+    '主力净流入': ('主力净流入(万元)', 1),
+    '涨跌幅': ('涨跌幅(%)', 1),
+    '换手率': ('换手率(%)', 1),
+    '权重': ('权重(%)', 100)
+}
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _format_stock_ranking_table(ranking_data, value_columns: tuple) -> pd.DataFrame:
+    """
+    格式化成分股排行榜表格（带缓存，榜单不变时重新运行直接复用）
+    :param ranking_data: 排行榜记录列表或成分股数据
+    :param value_columns: 需要格式化的数值列，改名的列按顺序追加到表格末尾
+    :return: 格式化后的表格
+    """
+    # 传入DataFrame时只做浅拷贝：格式化只替换整列，不会改动原数据
+    display_df = (ranking_data.copy(deep=False) if isinstance(ranking_data, pd.DataFrame)
+                  else pd.DataFrame(ranking_data))
+    if '股票代码' in display_df.columns:
+        display_df = display_df.rename(columns={'股票代码': '代码', '股票名称': '名称'})
+
+    for col in value_columns:
+        if col in display_df.columns:
+            label, scale = _STOCK_RANKING_COLUMNS[col]
+            if label == col:
+                values = display_df[col].to_numpy(dtype=np.float64) * scale
+            else:
+                values = display_df.pop(col).to_numpy(dtype=np.float64) * scale
+            display_df[label] = np.char.mod('%.2f', values)
+    return display_df
+
+
+# 板块历史明细数值列：原列名 -> (显示列名, 格式)
+_SECTOR_HISTORY_COLUMNS = {
+    '涨跌幅': ('涨跌幅(%)', '%.2f'),
+    '主力净流入': ('主力净流入(万元)', '%.2f'),
+    '换手率': ('换手率(%)', '%.2f'),
+    '上涨比例': ('上涨比例(%)', '%.1f')
+}
+
+
+@st.cache_data(ttl=SECTOR_CONFIG['cache_duration'], show_spinner=False)
+def _format_sector_history_table(history_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    格式化板块历史明细表格（带缓存），按日期倒序排列
+    :param history_data: 板块历史数据
+    :return: 格式化后的表格
+    """
+    # 浅拷贝即可：格式化只替换整列，未改动的列与原数据共享内存
+    display_data = history_data.copy(deep=False)
+    for col, (label, fmt) in _SECTOR_HISTORY_COLUMNS.items():
+        if col in display_data.columns:
+            values = display_data.pop(col).to_numpy(dtype=np.float64)
+            display_data[label] = np.char.mod(fmt, values)
+
+    if '交易日期' in display_data.columns:
+        display_data['交易日期'] = display_data['交易日期'].dt.strftime('%Y-%m-%d')
+
+    # 按日期倒序排列（最新的在前面）
+    return display_data.sort_values('交易日期', ascending=False)
+
+
+# 列名筛选只依赖列名元组，结果缓存后重新运行时不再重复做字符串匹配
+@st.cache_data(show_spinner=False)
+def _filter_columns(columns: tuple, exclude_patterns: tuple) -> list:
+    """
+    剔除列名中包含任一指定片段的列
+    :param columns: 列名元组
+    :param exclude_patterns: 需要剔除的列名片段
+    :return: 保留的列名列表
+    """
+    if not exclude_patterns:
+        return list(columns)
+    # 所有片段合并为一个正则，每个列名只做一次C层扫描
+    exclude_re = re.compile('|'.join(map(re.escape, exclude_patterns)))
+    return [col for col in columns if not exclude_re.search(col)]
+
+
+@st.cache_data(show_spinner=False)
+def _match_columns(columns: tuple, patterns: tuple) -> list:
+    """
+    按片段顺序挑选列名中包含指定片段的列（去重并保持顺序）
+    :param columns: 列名元组
+    :param patterns: 列名片段
+    :return: 匹配的列名列表
+    """
+    matched = [col for pattern in patterns for col in columns if pattern in col]
+    return list(dict.fromkeys(matched))
+
+
+def _hline(y: float, text: str, color: str, dash: str = "dash", row: int = 1) -> tuple:
+    """
+    构建水平参考线及其标注（与fig.add_hline生成的布局一致），
+    参考线汇总后随布局一次设置，避免逐条add_hline合并布局
+    :param y: 参考线纵坐标
+    :param text: 标注文字
+    :param color: 线条颜色
+    :param dash: 线型
+    :param row: 所在子图行号
+    :return: (shape, annotation)
+    """
+    suffix = '' if row == 1 else str(row)
+    xref, yref = f'x{suffix} domain', f'y{suffix}'
+    shape = dict(type='line', x0=0, x1=1, xref=xref, y0=y, y1=y, yref=yref,
+                 line=dict(color=color, dash=dash))
+    annotation = dict(text=text, showarrow=False, x=1, xanchor='right', xref=xref,
+                      y=y, yanchor='bottom', yref=yref)
+    return shape, annotation
+
+
+def _apply_hlines(fig, hlines) -> None:
+    """
+    将参考线一次性写入图表布局（标注追加在子图标题等已有标注之后）
+    :param fig: 图表对象
+    :param hlines: _hline生成的(shape, annotation)序列
+    """
+    if hlines:
+        shapes, annotations = zip(*hlines)
+        fig.update_layout(shapes=shapes, annotations=fig.layout.annotations + annotations)
+
+
+# 固定位置的参考线只构建一次
+_MARGIN_GUARANTEE_HLINES = (
+    _hline(130, "最低风险线(130%)", "red", row=4),
+    _hline(150, "警戒线(150%)", "orange", row=4),
+    _hline(200, "安全线(200%)", "green", row=4)
+)
+_RSI_HLINES = (
+    _hline(70, "超买线", "red"),
+    _hline(30, "超卖线", "green"),
+    _hline(50, "中位线", "gray")
+)
+
+
+# 两融图表缓存：侧边栏勾选项切换引起的重新运行不再重复构建Plotly图表，
+# 数据更新时以新的数据版本号为键重新构建
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'],
+               max_entries=MARGIN_TRADING_CONFIG['chart_cache_entries'], show_spinner=False)
+def _build_margin_balance_fig(_df: pd.DataFrame, data_version: str, max_points: int = 0):
+    """
+    构建两融交易数据趋势分析图（带缓存）
+    :param _df: 处理后的两融数据（不参与缓存哈希）
+    :param data_version: 数据版本号，两融数据更新时变化，作为缓存键
+    :param max_points: 单条曲线最大点数，0表示绘制全部数据点
+    :return: 图表对象
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    dates = _margin_dates(_df)
+    # 列名集合只构建一次，后续的列存在性判断都是集合查找
+    columns = frozenset(_df.columns)
+
+    # 四个子图共用同一条日期横轴，缩放/平移时同步联动
+    fig = make_subplots(
+        rows=4, cols=1,
+        shared_xaxes=True,
+        subplot_titles=['两融余额趋势', '两融余额日变化率', '净融资额趋势', '维持担保比例'],
+        vertical_spacing=0.04
+    )
+
+    # 余额、日变化率、净融资额三列一次取出并统一换算单位（余额类转换为万亿），
+    # 统计量按列一次归约，避免逐列重复扫描；没有有效数据的列不绘制，
+    # 避免用NaN统计量生成参考线和纵轴范围
+    stat_scales = {'两融余额': 1e12, '两融余额_日变化率': 1.0, '净融资额': 1e12}
+    stat_columns = [col for col in stat_scales if col in columns]
+    stat_values = _df[stat_columns].to_numpy(dtype=np.float64) / np.array(
+        [stat_scales[col] for col in stat_columns], dtype=np.float64)
+    stats = {col: col_stats
+             for col, col_stats in zip(stat_columns, zip(*_nan_column_stats(stat_values)))
+             if not np.isnan(col_stats[0])}
+    series = {col: stat_values[:, i] for i, col in enumerate(stat_columns)}
+
+    # 各子图的参考线，最后随布局一次设置
+    hlines = []
+
+    # 初始化纵轴范围变量
+    y1_min, y1_max = None, None
+    y2_min, y2_max = None, None
+    y3_min, y3_max = None, None
+
+    # 1. 两融余额趋势 - 显示绝对值，增强可见性
+    if '两融余额' in stats:
+        # 计算统计信息
+        balance_values = series['两融余额']
+        mean_balance, min_balance, max_balance = stats['两融余额']
+
+        # 统计信息基于全量数据，降采样只作用于绘制的曲线
+        plot_dates, plot_values = _downsample(dates, balance_values, max_points)
+        fig.add_trace(
+            go.Scattergl(
+                x=plot_dates,
+                # 绘图数据降为float32，减少传给浏览器的序列化数据量
+                y=plot_values.astype(np.float32),
+                name='两融余额',
+                mode='lines',
+                line=dict(color='#FF6B6B', width=3),
+                hovertemplate='<b>%{fullData.name}</b><br>' +
+                '日期: %{x}<br>' +
+                '两融余额: %{y:.2f}万亿<br>' +
+                '<extra></extra>'
+            ),
+            row=1, col=1
+        )
+
+        # 添加均值参考线
+        hlines.append(_hline(mean_balance, f"均值线 ({mean_balance:.2f}万亿)", "gray"))
+
+        # 自定义纵轴范围
+        margin = (max_balance - min_balance) * 0.05
+        y1_min = max(0, min_balance - margin)
+        y1_max = max_balance + margin
+
+    # 2. 两融余额日变化率 - 显示绝对值
+    if '两融余额_日变化率' in stats:
+        # 计算统计信息
+        change_rate = series['两融余额_日变化率']
+        mean_change, min_change, max_change = stats['两融余额_日变化率']
+
+        plot_dates, plot_values = _downsample(dates, change_rate, max_points)
+        fig.add_trace(
+            go.Scattergl(
+                x=plot_dates,
+                y=plot_values.astype(np.float32),
+                name='日变化率',
+                mode='lines',
+                line=dict(color='#9370DB', width=2),
+                fill='tozeroy',
+                fillcolor='rgba(147, 112, 219, 0.3)',
+                hovertemplate='<b>%{fullData.name}</b><br>' +
+                '日期: %{x}<br>' +
+                '日变化率: %{y:.2f}%<br>' +
+                '<extra></extra>'
+            ),
+            row=2, col=1
+        )
+
+        # 添加零基准线和均值线
+        hlines.append(_hline(0, "零变化线", "gray", row=2))
+        hlines.append(_hline(mean_change, f"均值线 ({mean_change:.2f}%)", "blue", "dot", row=2))
+
+        # 自定义纵轴范围
+        margin = (max_change - min_change) * 0.1 if max_change > min_change else 0.1
+        y2_min = min_change - margin
+        y2_max = max_change + margin
+
+    # 3. 净融资额趋势 - 显示绝对值
+    if '净融资额' in stats:
+        # 计算统计信息
+        net_values = series['净融资额']
+        mean_net, min_net, max_net = stats['净融资额']
+
+        plot_dates, plot_values = _downsample(dates, net_values, max_points)
+        fig.add_trace(
+            go.Scattergl(
+                x=plot_dates,
+                y=plot_values.astype(np.float32),
+                name='净融资额',
+                mode='lines',
+                line=dict(color='#4ECDC4', width=2),
+                fill='tozeroy',
+                fillcolor='rgba(78, 205, 196, 0.3)',
+                hovertemplate='<b>%{fullData.name}</b><br>' +
+                '日期: %{x}<br>' +
+                '净融资额: %{y:.2f}万亿<br>' +
+                '<extra></extra>'
+            ),
+            row=3, col=1
+        )
+
+        # 添加零基准线和均值线
+        hlines.append(_hline(0, "零基准线", "gray", row=3))
+        hlines.append(_hline(mean_net, f"均值线 ({mean_net:.2f}万亿)", "blue", "dot", row=3))
+
+        # 自定义纵轴范围
+        margin = (max_net - min_net) * 0.1 if max_net > min_net else 0.1
+        y3_min = min_net - margin
+        y3_max = max_net + margin
+
+    # 4. 市场整体维持担保比例
+    if '市场整体维持担保比例' in columns:
+        plot_dates, plot_values = _downsample(
+            dates, _df['市场整体维持担保比例'].to_numpy(dtype=np.float64), max_points)
+        fig.add_trace(
+            go.Scattergl(
+                x=plot_dates,
+                y=plot_values.astype(np.float32),
+                name='维持担保比例',
+                mode='lines',
+                line=dict(color='#45B7D1', width=2),
+                hovertemplate='<b>%{fullData.name}</b><br>' +
+                '日期: %{x}<br>' +
+                '担保比例: %{y:.1f}%<br>' +
+                '<extra></extra>'
+            ),
+            row=4, col=1
+        )
+
+        # 添加风险参考线
+        hlines.extend(_MARGIN_GUARANTEE_HLINES)
+
+    # 各子图纵轴标题和自定义范围汇总后随布局一次更新，避免逐个子图调用update_yaxes
+    y_axes = {}
+    for row, (title, y_min, y_max) in enumerate((
+            ("两融余额 (万亿)", y1_min, y1_max),
+            ("日变化率 (%)", y2_min, y2_max),
+            ("净融资额 (万亿)", y3_min, y3_max),
+            ("担保比例 (%)", None, None)), 1):
+        axis = dict(title=dict(text=title))
+        if y_min is not None and y_max is not None:
+            axis['range'] = [y_min, y_max]
+        y_axes['yaxis' if row == 1 else f'yaxis{row}'] = axis
+
+    _apply_hlines(fig, hlines)
+
+    fig.update_layout(
+        height=1200,  # 增加高度以适应四个子图
+        showlegend=True,
+        title_text="两融交易数据趋势分析",
+        title_x=0.5,
+        # 只画线不画点标记，并关闭过渡动画，缩放/平移时减少重绘开销；
+        # uirevision固定后页面重新运行时保留用户的缩放状态
+        transition_duration=0,
+        uirevision='margin',
+        **y_axes
+    )
+
+    return fig
+
+
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'],
+               max_entries=MARGIN_TRADING_CONFIG['chart_cache_entries'], show_spinner=False)
+def _build_margin_ratio_fig(_df: pd.DataFrame, data_version: str, max_points: int = 0):
+    """
+    构建融资占比趋势图（带缓存）
+    :param _df: 处理后的两融数据（不参与缓存哈希）
+    :param data_version: 数据版本号，两融数据更新时变化，作为缓存键
+    :param max_points: 曲线最大点数，0表示绘制全部数据点
+    :return: (图表对象, (最小占比, 最大占比, 平均占比, 波动幅度))
+    """
+    import plotly.graph_objects as go
+
+    dates = _margin_dates(_df)
+
+    # 计算融资占比
+    financing = _df['融资余额'].to_numpy(dtype=np.float64)
+    shorting = _df['融券余额'].to_numpy(dtype=np.float64)
+    financing_ratio = financing / (financing + shorting) * 100
+
+    # 计算统计信息
+    mean_financing_ratio, min_ratio, max_ratio = _nan_stats(financing_ratio)
+    ratio_range = max_ratio - min_ratio
+
+    # 创建单个图表
+    fig_ratio = go.Figure()
+
+    # 融资占比趋势 - 显示绝对值
+    plot_dates, plot_values = _downsample(dates, financing_ratio, max_points)
+    fig_ratio.add_trace(
+        go.Scattergl(
+            x=plot_dates,
+            y=plot_values.astype(np.float32),
+            name='融资占比',
+            line=dict(color='#FF6B6B', width=3),
+            fill='tozeroy',
+            fillcolor='rgba(255, 107, 107, 0.2)',
+            hovertemplate='<b>融资占比</b><br>' +
+            '日期: %{x}<br>' +
+            '融资占比: %{y:.2f}%<br>' +
+            '<extra></extra>'
+        )
+    )
+
+    # 添加均值参考线
+    _apply_hlines(fig_ratio, [_hline(mean_financing_ratio,
+                                     f"均值线 ({mean_financing_ratio:.2f}%)", "gray")])
+
+    # 自定义纵轴范围：从最小值到最大值，留一点边距
+    margin = ratio_range * 0.05  # 5%的边距
+    y_min = max(0, min_ratio - margin)  # 确保不小于0
+    y_max = min(100, max_ratio + margin)  # 确保不大于100
+
+    # 更新布局
+    fig_ratio.update_layout(
+        height=400,
+        showlegend=True,
+        title_text="融资占比时间序列分析",
+        title_x=0.5,
+        yaxis_title="融资占比 (%)",
+        yaxis=dict(
+            range=[y_min, y_max],
+            tickformat='.2f'
+        )
+    )
+
+    return fig_ratio, (min_ratio, max_ratio, mean_financing_ratio, ratio_range)
+
+
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'],
+               max_entries=MARGIN_TRADING_CONFIG['chart_cache_entries'], show_spinner=False)
+def _build_margin_rsi_fig(_df: pd.DataFrame, data_version: str, max_points: int = 0):
+    """
+    构建RSI相对强弱指标图（带缓存）
+    :param _df: 处理后的两融数据（不参与缓存哈希）
+    :param data_version: 数据版本号，两融数据更新时变化，作为缓存键
+    :param max_points: 曲线最大点数，0表示绘制全部数据点
+    :return: 图表对象
+    """
+    import plotly.graph_objects as go
+
+    dates = _margin_dates(_df)
+
+    fig_rsi = go.Figure()
+
+    plot_dates, plot_values = _downsample(
+        dates, _df['两融余额_RSI'].to_numpy(dtype=np.float64), max_points)
+    fig_rsi.add_trace(go.Scattergl(
+        x=plot_dates, y=plot_values.astype(np.float32),
+        name='RSI', line=dict(color='#45B7D1', width=2)
+    ))
+
+    # 添加参考线
+    _apply_hlines(fig_rsi, _RSI_HLINES)
+
+    fig_rsi.update_layout(
+        title="RSI相对强弱指标",
+        yaxis_title="RSI",
+        height=400,
+        yaxis=dict(range=[0, 100])
+    )
+
+    return fig_rsi
+
+
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'],
+               max_entries=MARGIN_TRADING_CONFIG['chart_cache_entries'], show_spinner=False)
+def _build_margin_corr_fig(_df: pd.DataFrame, data_version: str):
+    """
+    构建相关性热力图（带缓存），可用数值列不足时返回None
+    :param _df: 处理后的两融数据（不参与缓存哈希）
+    :param data_version: 数据版本号，两融数据更新时变化，作为缓存键
+    :return: 图表对象或None
+    """
+    import plotly.graph_objects as go
+
+    numeric_columns = _df.select_dtypes(include=[np.number]).columns
+    filtered_columns = _filter_columns(
+        tuple(numeric_columns),
+        ('_日变化', '_周变化', '_月变化', 'MA', 'RSI', '布林'))
+
+    if len(filtered_columns) < 2:
+        return None
+
+    corr_values = _nan_corr(_df[filtered_columns].to_numpy(dtype=np.float64))
+
+    # 直接构建Heatmap轨迹，不经过plotly.express（两融页面因此无需导入px），
+    # 布局与px.imshow的默认效果一致：纵轴自上而下、共享色轴
+    fig_heatmap = go.Figure(
+        go.Heatmap(
+            z=corr_values,
+            x=filtered_columns,
+            y=filtered_columns,
+            coloraxis='coloraxis',
+            hovertemplate='x: %{x}<br>y: %{y}<br>相关系数: %{z}<extra></extra>'
+        )
+    )
+
+    fig_heatmap.update_layout(
+        title="数据相关性热力图",
+        height=500,
+        margin=dict(t=60),
+        yaxis=dict(autorange='reversed'),
+        coloraxis=dict(colorscale='RdBu_r', autocolorscale=False,
+                       colorbar=dict(title=dict(text="相关系数")))
+    )
+
+    return fig_heatmap
+
+
+@st.cache_data(ttl=MARGIN_TRADING_CONFIG['cache_duration'], show_spinner=False)
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    """
+    将数据导出为带BOM的UTF-8 CSV（带缓存，同一份数据只序列化一次）
+    优先使用pyarrow的CSV写入器，无法转换为Arrow表的数据回退到pandas
+    :param df: 要导出的数据
+    :return: CSV字节内容
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    buffer = io.BytesIO()
+    buffer.write(b'\xef\xbb\xbf')
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df.to_csv(buffer, index=False)
+        return buffer.getvalue()
+
+    # 日期列（不含时间部分）按日期写出，与pandas导出的格式保持一致
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            column = df[field.name]
+            if column.equals(column.dt.normalize()):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+
+    pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(quoting_style='needed'))
+    return buffer.getvalue()
 
 
 class MarginTradingWebApp:
@@ -137,22 +1133,11 @@ class MarginTradingWebApp:
         :param show_sign: 是否显示正负号
         :return: 带颜色的HTML字符串
         """
-        if value > 0:
-            color_class = "positive-value"
-            sign = "+" if show_sign else ""
-        elif value < 0:
-            color_class = "negative-value"
+        color_class, sign = _COLOR_SIGN_LUT[int(value > 0) - int(value < 0)]
+        if not show_sign:
             sign = ""
-        else:
-            color_class = "neutral-value"
-            sign = ""
-
-        if is_percentage:
-            formatted_value = f"{sign}{value:.2f}%"
-        else:
-            formatted_value = f"{sign}{value:.2f}"
-
-        return f'<span class="{color_class}">{formatted_value}</span>'
+        template = _SPAN_PERCENT if is_percentage else _SPAN_NUMBER
+        return template.format(color_class, sign, value)
 
     def _format_money_with_color(self, value: float, unit: str = "亿元") -> str:
         """
@@ -161,18 +1146,8 @@ class MarginTradingWebApp:
         :param unit: 单位
         :return: 带颜色的HTML字符串
         """
-        if value > 0:
-            color_class = "positive-value"
-            sign = "+"
-        elif value < 0:
-            color_class = "negative-value"
-            sign = ""
-        else:
-            color_class = "neutral-value"
-            sign = ""
-
-        formatted_value = f"{sign}{value:.2f}{unit}"
-        return f'<span class="{color_class}">{formatted_value}</span>'
+        color_class, sign = _COLOR_SIGN_LUT[int(value > 0) - int(value < 0)]
+        return _SPAN_MONEY.format(color_class, sign, value, unit)
 
     def _show_data_source_error(self, error_type: str = "connection"):
         """
@@ -197,67 +1172,45 @@ class MarginTradingWebApp:
         # 确保目录存在
         ensure_directories()
 
-        # 初始化组件
-        self.data_fetcher = create_margin_fetcher()
-        self.data_processor = create_margin_processor()
-        self.visualizer = create_margin_visualizer()
+        # 初始化组件（Web界面的图表由Plotly直接绘制，
+        # 不加载依赖matplotlib/seaborn的两融可视化模块）
+        self.data_fetcher = _get_margin_fetcher()
+        self.data_processor = _get_margin_processor()
 
         # 初始化session state
-        if 'margin_data' not in st.session_state:
-            st.session_state.margin_data = pd.DataFrame()
+        # 原始两融数据由数据缓存持有，会话中只保存处理结果
         if 'processed_data' not in st.session_state:
             st.session_state.processed_data = pd.DataFrame()
+        if 'processed_data_version' not in st.session_state:
+            st.session_state.processed_data_version = ''
         if 'analysis_result' not in st.session_state:
             st.session_state.analysis_result = {}
 
     def _clear_etf_data(self):
         """清除ETF相关的session state数据"""
-        keys_to_clear = ['etf_data', 'current_etf_code', 'last_etf_query_key']
-        for key in keys_to_clear:
-            if key in st.session_state:
-                del st.session_state[key]
+        for key in _ETF_STATE_KEYS:
+            st.session_state.pop(key, None)
 
     def _clear_margin_data(self):
-        """清除两融相关的session state数据"""
-        keys_to_clear = ['margin_data', 'processed_data', 'analysis_result']
-        for key in keys_to_clear:
-            if key in st.session_state:
-                st.session_state[key] = pd.DataFrame() if 'data' in key else {}
+        """清除两融相关的session state数据（下次运行时由_initialize_app重新初始化）"""
+        for key in _MARGIN_STATE_KEYS:
+            st.session_state.pop(key, None)
 
     def _clear_sector_data(self):
         """清除板块相关的session state数据"""
-        keys_to_clear = ['sector_data', 'sector_analysis',
-                         'current_sector', 'sector_detail_data',
-                         'index_sector_detail_data', 'current_index_code']
-        for key in keys_to_clear:
-            if key in st.session_state:
-                del st.session_state[key]
+        for key in _SECTOR_STATE_KEYS:
+            st.session_state.pop(key, None)
 
     def show_main_page(self):
         """显示主页"""
-        st.markdown('<div class="main-header">📊 A股金融数据分析系统</div>',
-                    unsafe_allow_html=True)
-
-        st.markdown("""
-        <div class="info-box">
-            <h3>🎯 欢迎使用A股金融数据分析系统</h3>
-            <p>📈 本系统提供专业的A股市场数据分析功能，帮助投资者做出更明智的投资决策</p>
-            <p>🚀 支持两融交易分析和ETF基金分析，数据实时更新，图表直观易懂</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # 创建功能卡片布局
+        # 页头和功能卡片为静态HTML，各用一次markdown输出
+        st.markdown(_MAIN_PAGE_HEADER_HTML, unsafe_allow_html=True)
+        st.markdown(_MAIN_FEATURE_CARDS_HTML, unsafe_allow_html=True)
+
+        # 功能入口按钮与上方卡片一一对应
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            st.markdown("""
-            <div class="feature-card">
-                <div class="feature-icon">📈</div>
-                <div class="feature-title">两融交易查询</div>
-                <div class="feature-description">查询和分析A股市场的融资融券交易数据，包括余额趋势、占比分析等</div>
-            </div>
-            """, unsafe_allow_html=True)
-
             if st.button("进入两融交易查询", type="primary", width="stretch"):
                 # 清除其他数据，切换到两融页面
                 self._clear_etf_data()
@@ -266,14 +1219,6 @@ class MarginTradingWebApp:
                 st.rerun()
 
         with col2:
-            st.markdown("""
-            <div class="feature-card">
-                <div class="feature-icon">💰</div>
-                <div class="feature-title">ETF基金查询</div>
-                <div class="feature-description">查询和分析ETF基金的资金流向、份额变动、申购赎回情况</div>
-            </div>
-            """, unsafe_allow_html=True)
-
             if st.button("进入ETF基金查询", type="primary", width="stretch"):
                 # 清除其他数据，切换到ETF页面
                 self._clear_margin_data()
@@ -282,14 +1227,6 @@ class MarginTradingWebApp:
                 st.rerun()
 
         with col3:
-            st.markdown("""
-            <div class="feature-card">
-                <div class="feature-icon">🏢</div>
-                <div class="feature-title">板块资金查询</div>
-                <div class="feature-description">查询和分析中国股市各板块的资金流向情况，包括主力资金、涨跌幅等</div>
-            </div>
-            """, unsafe_allow_html=True)
-
             if st.button("进入板块资金查询", type="primary", width="stretch"):
                 # 清除其他数据，切换到板块页面
                 self._clear_margin_data()
@@ -329,13 +1266,7 @@ class MarginTradingWebApp:
             - **详细分析**：深入分析单个板块的成分股情况
             """)
 
-        st.markdown("### ⚠️ 使用说明")
-        st.markdown("""
-        1. 点击上方功能按钮进入相应的查询界面
-        2. 每个功能模块完全独立，互不影响
-        3. 首次查询可能需要较长时间，请耐心等待
-        4. 建议查询时间范围不超过1年，以确保查询效率
-        """)
+        st.markdown(_load_md('main_intro.md'))
 
     def show_margin_trading_page(self):
         """显示两融交易查询页面"""
@@ -389,91 +1320,77 @@ class MarginTradingWebApp:
         # ETF查询配置
         st.sidebar.header("🔧 ETF查询配置")
 
-        # ETF代码输入
-        etf_code = st.sidebar.text_input("请输入ETF代码", value="510310",
-                                         help="例如：510310 (沪深300ETF), 510050 (上证50ETF)")
-
-        # 检测ETF代码变化
-        if 'last_etf_input' not in st.session_state:
-            st.session_state.last_etf_input = ""
-
-        if etf_code != st.session_state.last_etf_input and etf_code:
-            st.session_state.last_etf_input = etf_code
-            # 显示ETF代码提示
-            etf_name_mapping = {
-                '510310': '沪深300ETF',
-                '510050': '上证50ETF',
-                '510500': '中证500ETF',
-                '159919': '沪深300ETF',
-                '159915': '创业板ETF',
-                '512100': '中证1000ETF'
-            }
-            if etf_code in etf_name_mapping:
-                st.sidebar.success(f"✅ 识别为: {etf_name_mapping[etf_code]}")
-            else:
-                st.sidebar.info(f"💡 ETF代码: {etf_code}")
+        # 查询参数放在表单中，调整代码、日期和选项时不触发重新运行，
+        # 只有点击"开始查询"才提交并运行一次
+        with st.sidebar.form("etf_config_form", clear_on_submit=False):
+            # ETF代码输入
+            etf_code = st.text_input("请输入ETF代码", value="510310",
+                                     help="例如：510310 (沪深300ETF), 510050 (上证50ETF)")
 
-        # 日期范围选择
-        st.sidebar.subheader("📅 日期范围")
+            # 日期范围选择
+            st.subheader("📅 日期范围")
 
-        col1, col2 = st.sidebar.columns(2)
+            col1, col2 = st.columns(2)
 
-        with col1:
-            start_date = st.date_input(
-                "开始日期",
-                value=datetime.now() - timedelta(days=90),
-                max_value=datetime.now()
-            )
+            with col1:
+                start_date = st.date_input(
+                    "开始日期",
+                    value=datetime.now() - timedelta(days=90),
+                    max_value=datetime.now()
+                )
 
-        with col2:
-            end_date = st.date_input(
-                "结束日期",
-                value=datetime.now(),
-                max_value=datetime.now()
-            )
+            with col2:
+                end_date = st.date_input(
+                    "结束日期",
+                    value=datetime.now(),
+                    max_value=datetime.now()
+                )
 
-        # 查询选项
-        st.sidebar.subheader("⚙️ 查询选项")
+            # 查询选项
+            st.subheader("⚙️ 查询选项")
 
-        use_cache = st.sidebar.checkbox("使用缓存数据", value=True,
-                                        help="使用缓存可以加快查询速度")
+            use_cache = st.checkbox("使用缓存数据", value=True,
+                                    help="使用缓存可以加快查询速度")
 
-        # 图表选项
-        st.sidebar.subheader("📊 图表选项")
+            # 图表选项
+            st.subheader("📊 图表选项")
 
-        show_comprehensive_chart = st.sidebar.checkbox("综合分析图", value=True)
+            show_comprehensive_chart = st.checkbox("综合分析图", value=True)
 
-        # 查询按钮
-        st.sidebar.markdown("---")  # 分隔线
-        query_button = st.sidebar.button(
-            "🚀 开始查询", type="primary", width="stretch")
+            # 查询按钮
+            st.markdown("---")  # 分隔线
+            query_button = st.form_submit_button(
+                "🚀 开始查询", type="primary", width="stretch")
+
+        # 日期字符串只转换一次，供查询配置和查询键共用
+        start_date_str = start_date.strftime('%Y%m%d')
+        end_date_str = end_date.strftime('%Y%m%d')
 
         config = {
             'etf_code': etf_code,
-            'start_date': start_date.strftime('%Y%m%d'),
-            'end_date': end_date.strftime('%Y%m%d'),
+            'start_date': start_date_str,
+            'end_date': end_date_str,
             'use_cache': use_cache,
             'show_comprehensive_chart': show_comprehensive_chart,
             'query_button': query_button
         }
 
-        # 检查参数是否发生变化
-        current_query_key = f"{etf_code}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
-        if 'last_etf_query_key' not in st.session_state:
-            st.session_state.last_etf_query_key = ""
-
-        # 检查ETF代码是否发生变化
-        if 'current_etf_code' not in st.session_state:
-            st.session_state.current_etf_code = ""
+        # 检查参数是否发生变化：ETF代码或日期范围变化时清除旧数据
+        current_query_key = f"{etf_code}_{start_date_str}_{end_date_str}"
+        prev_code = st.session_state.get('current_etf_code')
+        prev_key = st.session_state.get('last_etf_query_key')
 
-        # 如果ETF代码发生变化，立即清除旧数据
-        if st.session_state.current_etf_code != etf_code:
+        if prev_code != etf_code or prev_key != current_query_key:
             self._clear_etf_data()
             st.session_state.current_etf_code = etf_code
 
-        # 如果查询参数发生变化，也清除旧数据
-        elif st.session_state.last_etf_query_key != current_query_key:
-            self._clear_etf_data()
+            # ETF代码变化（表单提交后才会变化）时提示识别结果
+            if prev_code != etf_code and etf_code:
+                etf_name = _ETF_NAME_MAP.get(etf_code)
+                if etf_name:
+                    st.toast(f"✅ 识别为: {etf_name}")
+                else:
+                    st.toast(f"💡 ETF代码: {etf_code}")
 
         # 如果点击查询按钮
         if config['query_button']:
@@ -517,28 +1434,7 @@ class MarginTradingWebApp:
 
                     # 显示一些使用提示
                     with st.expander("💡 使用提示", expanded=True):
-                        st.markdown("""
-                        ### 如何使用ETF查询功能：
-                        
-                        1. **输入ETF代码**：在左侧输入框中输入ETF代码（如510310）
-                        2. **选择日期范围**：选择要查询的开始和结束日期
-                        3. **点击查询**：点击"开始查询"按钮获取数据
-                        4. **查看结果**：系统将自动显示ETF的各项分析数据
-                        
-                        ### 常用ETF代码：
-                        - **510310**: 沪深300ETF
-                        - **510050**: 上证50ETF  
-                        - **510500**: 中证500ETF
-                        - **159919**: 沪深300ETF（深交所）
-                        - **159915**: 创业板ETF
-                        - **512100**: 中证1000ETF
-                        
-                        ### 功能说明：
-                        - **资金流向分析**：显示ETF的资金净流入/流出情况
-                        - **份额变动分析**：分析ETF份额的变化趋势
-                        - **场外市场分析**：模拟申购赎回情况
-                        - **实时估值**：显示ETF的价格变化趋势
-                        """)
+                        st.markdown(_load_md('etf_tips.md'))
                 else:
                     st.warning("⚠️ 请输入有效的ETF代码")
 
@@ -595,34 +1491,7 @@ class MarginTradingWebApp:
             else:
                 # 显示使用提示
                 with st.expander("💡 使用提示", expanded=True):
-                    st.markdown("""
-                    ### 板块资金查询功能说明：
-                    
-                    #### 📊 板块概览模式
-                    - 查询所有板块的资金流向排行榜
-                    - 显示主力资金净流入/流出情况
-                    - 分析板块涨跌幅和市场表现
-                    - 提供市场情绪分析
-                    
-                    #### 🔍 单板块详情模式  
-                    - 输入具体板块名称查询详细信息
-                    - 显示板块内成分股的资金流向
-                    - 分析板块强度和龙头效应
-                    - 提供个股排行榜
-                    
-                    #### 📈 数据说明
-                    - **主力资金**：超大单+大单净流入金额
-                    - **涨跌幅**：板块平均涨跌幅
-                    - **换手率**：板块平均换手率
-                    - **量比**：当日成交量与近期平均成交量的比值
-                    
-                    #### ⚠️ 重要提醒
-                    - 所有数据均为真实市场数据，不提供模拟数据
-                    - 数据获取失败时会明确提示，请勿基于错误信息做投资决策
-                    - 建议在网络稳定的环境下使用
-                    
-                    点击"查询所有板块"开始使用！
-                    """)
+                    st.markdown(_load_md('sector_tips.md'))
 
         else:
             # 单板块详情模式
@@ -655,8 +1524,7 @@ class MarginTradingWebApp:
             selected_index_code = None
             if sector_input and sector_input.strip():
                 # 搜索相似板块
-                from sector.fetcher import create_sector_fetcher
-                sector_fetcher = create_sector_fetcher()
+                sector_fetcher = _get_sector_fetcher()
                 similar_sectors = sector_fetcher.search_similar_sectors(
                     sector_input.strip())
 
@@ -739,76 +1607,26 @@ class MarginTradingWebApp:
 
                 # 显示使用说明
                 with st.expander("💡 使用说明", expanded=True):
-                    st.markdown("""
-                    ### 如何使用单板块查询：
-                    
-                    1. **输入板块关键词**：在左侧输入框中输入板块相关的关键词
-                       - 例如：医药、科技、金融、消费、能源等
-                    
-                    2. **选择匹配板块**：系统会显示最相似的5个板块供您选择
-                       - 每个选项显示板块名称、指数代码和匹配度
-                    
-                    3. **查询详细数据**：选择板块后点击"查询板块详情"
-                       - 系统会获取该指数的权重股数据
-                       - 按权重融合计算板块整体表现
-                    
-                    ### 数据说明：
-                    - **权重股分析**：基于指数成分股及其权重
-                    - **资金流向**：成分股资金流向的加权汇总
-                    - **涨跌幅**：按权重计算的加权平均涨跌幅
-                    - **板块强度**：综合多个指标评估板块表现
-                    
-                    ### 常用搜索关键词：
-                    - **科技类**：科技、软件、电子、通信、互联网
-                    - **医药类**：医药、生物、医疗、健康
-                    - **金融类**：金融、银行、保险、证券
-                    - **消费类**：消费、食品、饮料、零售
-                    - **能源类**：能源、电力、石油、煤炭
-                    """)
+                    st.markdown(_load_md('sector_detail_tips.md'))
 
     def query_sector_overview(self, config: dict) -> bool:
         """查询板块概览数据"""
         try:
-            # 初始化板块组件
-            from sector.fetcher import create_sector_fetcher
-            from sector.processor import create_sector_processor
-
-            sector_fetcher = create_sector_fetcher()
-            sector_processor = create_sector_processor()
-
-            # 创建进度条
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
             # 获取板块资金流向数据
-            status_text.text("正在获取板块资金流向数据...")
-            progress_bar.progress(50)
-
-            sector_data = sector_fetcher.get_sector_fund_flow()
+            sector_data = _fetch_sector_fund_flow()
 
             if sector_data.empty:
-                progress_bar.empty()
-                status_text.empty()
+                # 空结果不保留在缓存中，下次查询重新请求数据源
+                _fetch_sector_fund_flow.clear()
                 self._show_data_source_error("connection")
                 return False
 
             # 处理数据
-            status_text.text("正在处理板块数据...")
-            progress_bar.progress(80)
-
-            processed_data = sector_processor.process_sector_data(sector_data)
+            processed_data = _process_sector_data(sector_data)
 
             # 保存到session state
             st.session_state.sector_data = processed_data
 
-            # 完成
-            progress_bar.progress(100)
-            status_text.text("数据处理完成！")
-
-            # 清除进度条和状态文本
-            progress_bar.empty()
-            status_text.empty()
-
             st.success(f"✅ 成功获取并处理了 {len(sector_data)} 个板块的数据")
             return True
 
@@ -819,46 +1637,26 @@ class MarginTradingWebApp:
     def query_index_sector_history(self, index_code: str, days: int = 60) -> bool:
         """查询指数板块历史数据"""
         try:
-            # 初始化板块组件
-            from sector.fetcher import create_sector_fetcher
-            from sector.processor import create_sector_processor
-
-            sector_fetcher = create_sector_fetcher()
-            sector_processor = create_sector_processor()
-
-            # 创建进度条
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
             # 获取指数板块历史数据
-            status_text.text(f"正在获取指数 {index_code} 的历史数据（{days}天）...")
-            progress_bar.progress(20)
-
-            history_data = sector_fetcher.get_sector_history_by_index(
-                index_code, days)
+            history_data = _fetch_sector_history_by_index(index_code, days)
 
             if history_data.empty:
-                progress_bar.empty()
-                status_text.empty()
+                # 空结果不保留在缓存中，下次查询重新请求数据源
+                _fetch_sector_history_by_index.clear(index_code, days)
                 self._show_data_source_error("connection")
                 return False
 
-            progress_bar.progress(60)
-            status_text.text("正在分析历史数据...")
-
             # 分析历史数据
-            history_analysis = sector_processor.analyze_sector_history(
-                history_data)
-
-            progress_bar.progress(80)
-            status_text.text("正在获取当前数据...")
+            history_analysis = _analyze_sector_history(history_data)
 
             # 同时获取当前数据用于对比
-            current_data = sector_fetcher.get_sector_data_by_index(index_code)
+            current_data = _fetch_sector_data_by_index(index_code)
             current_analysis = {}
             if not current_data.empty:
-                current_analysis = sector_processor.analyze_index_sector_detail(
+                current_analysis = _analyze_index_sector_detail(
                     index_code, current_data)
+            else:
+                _fetch_sector_data_by_index.clear(index_code)
 
             # 保存到session state
             st.session_state.sector_history_data = history_data
@@ -866,14 +1664,6 @@ class MarginTradingWebApp:
             st.session_state.sector_current_analysis = current_analysis
             st.session_state.current_index_code = index_code
 
-            # 完成
-            progress_bar.progress(100)
-            status_text.text("数据处理完成！")
-
-            # 清除进度条和状态文本
-            progress_bar.empty()
-            status_text.empty()
-
             sector_name = history_data['板块名称'].iloc[
                 0] if not history_data.empty else f'指数{index_code}'
             st.success(
@@ -887,48 +1677,23 @@ class MarginTradingWebApp:
     def query_index_sector_detail(self, index_code: str, config: dict) -> bool:
         """查询指数板块详细数据"""
         try:
-            # 初始化板块组件
-            from sector.fetcher import create_sector_fetcher
-            from sector.processor import create_sector_processor
-
-            sector_fetcher = create_sector_fetcher()
-            sector_processor = create_sector_processor()
-
-            # 创建进度条
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
             # 获取指数板块数据
-            status_text.text(f"正在获取指数 {index_code} 的成分股数据...")
-            progress_bar.progress(30)
-
-            sector_data = sector_fetcher.get_sector_data_by_index(index_code)
+            sector_data = _fetch_sector_data_by_index(index_code)
 
             if sector_data.empty:
-                progress_bar.empty()
-                status_text.empty()
+                # 空结果不保留在缓存中，下次查询重新请求数据源
+                _fetch_sector_data_by_index.clear(index_code)
                 self._show_data_source_error("connection")
                 return False
 
             # 处理数据
-            status_text.text("正在分析指数板块数据...")
-            progress_bar.progress(80)
-
-            analysis_result = sector_processor.analyze_index_sector_detail(
+            analysis_result = _analyze_index_sector_detail(
                 index_code, sector_data)
 
             # 保存到session state
             st.session_state.index_sector_detail_data = analysis_result
             st.session_state.current_index_code = index_code
 
-            # 完成
-            progress_bar.progress(100)
-            status_text.text("数据处理完成！")
-
-            # 清除进度条和状态文本
-            progress_bar.empty()
-            status_text.empty()
-
             sector_name = analysis_result.get('sector_name', f'指数{index_code}')
             stock_count = analysis_result.get('summary', {}).get('成分股数量', 0)
             st.success(f"✅ 成功获取并分析了指数板块 {sector_name} 的 {stock_count} 只权重股数据")
@@ -941,48 +1706,22 @@ class MarginTradingWebApp:
     def query_sector_detail(self, sector_name: str, config: dict) -> bool:
         """查询单个板块详细数据"""
         try:
-            # 初始化板块组件
-            from sector.fetcher import create_sector_fetcher
-            from sector.processor import create_sector_processor
-
-            sector_fetcher = create_sector_fetcher()
-            sector_processor = create_sector_processor()
-
-            # 创建进度条
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
             # 获取板块详细数据
-            status_text.text(f"正在获取板块 {sector_name} 的详细数据...")
-            progress_bar.progress(50)
-
-            detail_data = sector_fetcher.get_sector_detail(sector_name)
+            detail_data = _fetch_sector_detail(sector_name)
 
             if detail_data.empty:
-                progress_bar.empty()
-                status_text.empty()
+                # 空结果不保留在缓存中，下次查询重新请求数据源
+                _fetch_sector_detail.clear(sector_name)
                 self._show_data_source_error("connection")
                 return False
 
             # 处理数据
-            status_text.text("正在分析板块数据...")
-            progress_bar.progress(80)
-
-            analysis_result = sector_processor.analyze_sector_detail(
-                sector_name, detail_data)
+            analysis_result = _analyze_sector_detail(sector_name, detail_data)
 
             # 保存到session state
             st.session_state.sector_detail_data = analysis_result
             st.session_state.current_sector = sector_name
 
-            # 完成
-            progress_bar.progress(100)
-            status_text.text("数据处理完成！")
-
-            # 清除进度条和状态文本
-            progress_bar.empty()
-            status_text.empty()
-
             st.success(
                 f"✅ 成功获取并分析了板块 {sector_name} 的 {len(detail_data)} 只成分股数据")
             return True
@@ -1003,33 +1742,17 @@ class MarginTradingWebApp:
             st.subheader("📊 板块市场概览")
             summary = processed_data['summary']
 
-            col1, col2, col3, col4 = st.columns(4)
-
-            with col1:
-                st.metric(
-                    label="📈 总板块数",
-                    value=summary.get('总板块数', 0)
-                )
-
-            with col2:
-                st.metric(
-                    label="💰 资金净流入板块",
-                    value=summary.get('资金净流入板块', 0),
-                    delta=summary.get('资金流入占比', '0%')
-                )
-
-            with col3:
-                st.metric(
-                    label="📊 上涨板块",
-                    value=summary.get('上涨板块', 0),
-                    delta=summary.get('上涨占比', '0%')
-                )
-
-            with col4:
-                st.metric(
-                    label="💵 总资金净流入",
-                    value=summary.get('总资金净流入', '0.00亿元')
-                )
+            net_flow = summary.get('总资金净流入', '0.00亿元')
+            cards = (
+                ('', "📈 总板块数", str(summary.get('总板块数', 0)), ''),
+                ('', "💰 资金净流入板块", str(summary.get('资金净流入板块', 0)),
+                 summary.get('资金流入占比', '0%')),
+                ('', "📊 上涨板块", str(summary.get('上涨板块', 0)),
+                 summary.get('上涨占比', '0%')),
+                (_metric_tone(summary.get('总资金净流入值', 0.0)),
+                 "💵 总资金净流入", net_flow, ''),
+            )
+            st.markdown(_metric_cards_html(cards), unsafe_allow_html=True)
 
         # 显示市场情绪
         if 'market_sentiment' in processed_data and config['show_sentiment_gauge']:
@@ -1040,56 +1763,39 @@ class MarginTradingWebApp:
 
             with col1:
                 # 显示情绪指标
-                for key, value in sentiment.items():
-                    if key != '情绪评分':
-                        # 根据指标类型添加颜色
-                        if key in ['上涨比例', '资金流入比例'] and '%' in str(value):
-                            # 提取百分比数值
-                            try:
-                                pct_value = float(str(value).replace('%', ''))
-                                # 显示实际百分比值，用50%作为中性基准来判断颜色
-                                deviation = pct_value - 50  # 计算偏离50%的程度
-                                if deviation > 0:
-                                    color_class = "positive-value"
-                                elif deviation < 0:
-                                    color_class = "negative-value"
-                                else:
-                                    color_class = "neutral-value"
-
-                                colored_value = f'<span class="{color_class}">{pct_value:.1f}%</span>'
-                                st.markdown(
-                                    f"**{key}**: {colored_value}", unsafe_allow_html=True)
-                            except:
-                                st.metric(label=key, value=value)
-                        elif key == '平均涨跌幅' and '%' in str(value):
-                            try:
-                                pct_value = float(str(value).replace('%', ''))
-                                colored_value = self._format_value_with_color(
-                                    pct_value, True)
-                                st.markdown(
-                                    f"**{key}**: {colored_value}", unsafe_allow_html=True)
-                            except:
-                                st.metric(label=key, value=value)
-                        else:
-                            st.metric(label=key, value=value)
+                if sentiment:
+                    st.metric(label='市场情绪', value=sentiment['市场情绪'])
+
+                    # 比例类指标以50%作为中性基准判断颜色，平均涨跌幅按正负着色，
+                    # 三项合并为一次markdown输出
+                    lines = []
+                    for key in ('上涨比例', '资金流入比例'):
+                        pct_value = sentiment[key]
+                        color_class, _ = _COLOR_SIGN_LUT[int(pct_value > 50) - int(pct_value < 50)]
+                        lines.append(
+                            f'**{key}**: <span class="{color_class}">{pct_value:.1f}%</span>')
+                    lines.append("**平均涨跌幅**: " + self._format_value_with_color(
+                        sentiment['平均涨跌幅'], True))
+                    st.markdown("  \n".join(lines), unsafe_allow_html=True)
+
+                    flow_ratio = sentiment['资金流向比']
+                    st.metric(label='资金流向比',
+                              value=f"{flow_ratio:.2f}" if np.isfinite(flow_ratio) else "∞")
 
             with col2:
                 # 显示情绪仪表盘
                 if config['show_sentiment_gauge']:
-                    from sector.visualizer import create_sector_visualizer
-                    visualizer = create_sector_visualizer()
-                    gauge_chart = visualizer.create_market_sentiment_gauge(
-                        processed_data)
+                    gauge_chart = _build_sentiment_gauge(
+                        sentiment.get('情绪评分', 50))
                     if gauge_chart:
                         st.plotly_chart(gauge_chart, width="stretch")
 
         # 显示概览图表
         if config['show_overview_chart']:
             st.subheader("📈 板块资金流向概览")
-            from sector.visualizer import create_sector_visualizer
-            visualizer = create_sector_visualizer()
-            overview_chart = visualizer.create_sector_overview_chart(
-                processed_data)
+            overview_chart = None
+            if 'raw_data' in processed_data:
+                overview_chart = _build_sector_overview_fig(processed_data['raw_data'])
             if overview_chart:
                 st.plotly_chart(overview_chart, width="stretch")
 
@@ -1097,111 +1803,50 @@ class MarginTradingWebApp:
         if 'rankings' in processed_data:
             st.subheader("🏆 板块排行榜")
 
-            # 排行榜选项卡
-            tab1, tab2, tab3, tab4 = st.tabs(
-                ["💰 资金流入榜", "📉 资金流出榜", "📈 涨幅榜", "📊 跌幅榜"])
-
-            with tab1:
-                if config['show_ranking_charts']:
-                    from sector.visualizer import create_sector_visualizer
-                    visualizer = create_sector_visualizer()
-                    inflow_chart = visualizer.create_sector_ranking_chart(
-                        processed_data, 'inflow')
-                    if inflow_chart:
-                        st.plotly_chart(inflow_chart, width="stretch")
-
-                # 显示数据表格
-                inflow_data = processed_data['rankings'].get('资金流入榜', [])
-                if inflow_data:
-                    df = pd.DataFrame(inflow_data)
-                    # 格式化数据表格
-                    df_display = df.copy()
-                    if '主力资金' in df_display.columns:
-                        df_display['主力资金'] = df_display['主力资金'].apply(
-                            lambda x: f"+{x:.2f}亿" if x > 0 else f"{x:.2f}亿")
-                    if '涨跌幅' in df_display.columns:
-                        df_display['涨跌幅'] = df_display['涨跌幅'].apply(
-                            lambda x: f"+{x:.2f}%" if x > 0 else f"{x:.2f}%")
-                    st.dataframe(df_display, width="stretch")
-                else:
-                    st.info("📊 当前市场中没有资金净流入的板块")
-                    st.markdown("**可能原因：**")
-                    st.markdown("- 市场整体处于资金流出状态")
-                    st.markdown("- 所有板块都在下跌或调整中")
-                    st.markdown("- 建议查看资金流出榜了解市场情况")
-
-            with tab2:
-                if config['show_ranking_charts']:
-                    from sector.visualizer import create_sector_visualizer
-                    visualizer = create_sector_visualizer()
-                    outflow_chart = visualizer.create_sector_ranking_chart(
-                        processed_data, 'outflow')
-                    if outflow_chart:
-                        st.plotly_chart(outflow_chart, width="stretch")
-
-                # 显示数据表格
-                outflow_data = processed_data['rankings'].get('资金流出榜', [])
-                if outflow_data:
-                    df = pd.DataFrame(outflow_data)
-                    # 格式化数据表格
-                    df_display = df.copy()
-                    if '主力资金' in df_display.columns:
-                        df_display['主力资金'] = df_display['主力资金'].apply(
-                            lambda x: f"+{x:.2f}亿" if x > 0 else f"{x:.2f}亿")
-                    if '涨跌幅' in df_display.columns:
-                        df_display['涨跌幅'] = df_display['涨跌幅'].apply(
-                            lambda x: f"+{x:.2f}%" if x > 0 else f"{x:.2f}%")
-                    st.dataframe(df_display, width="stretch")
-                else:
-                    st.info("📊 当前市场中没有资金净流出的板块")
-                    st.markdown("**可能原因：**")
-                    st.markdown("- 市场整体处于资金流入状态")
-                    st.markdown("- 所有板块都在上涨或反弹中")
-                    st.markdown("- 建议查看资金流入榜了解热门板块")
-
-            with tab3:
-                if config['show_ranking_charts']:
-                    from sector.visualizer import create_sector_visualizer
-                    visualizer = create_sector_visualizer()
-                    rising_chart = visualizer.create_sector_ranking_chart(
-                        processed_data, 'rising')
-                    if rising_chart:
-                        st.plotly_chart(rising_chart, width="stretch")
-
-                # 显示数据表格
-                rising_data = processed_data['rankings'].get('涨幅榜', [])
-                if rising_data:
-                    df = pd.DataFrame(rising_data)
-                    # 格式化数据表格
-                    df_display = df.copy()
-                    if '主力资金' in df_display.columns:
-                        df_display['主力资金'] = df_display['主力资金'].apply(
-                            lambda x: f"+{x:.2f}亿" if x > 0 else f"{x:.2f}亿")
-                    if '涨跌幅' in df_display.columns:
-                        df_display['涨跌幅'] = df_display['涨跌幅'].apply(
-                            lambda x: f"+{x:.2f}%" if x > 0 else f"{x:.2f}%")
-                    st.dataframe(df_display, width="stretch")
-
-            with tab4:
-                if config['show_ranking_charts']:
-                    from sector.visualizer import create_sector_visualizer
-                    visualizer = create_sector_visualizer()
-                    falling_chart = visualizer.create_sector_ranking_chart(
-                        processed_data, 'falling')
-                    if falling_chart:
-                        st.plotly_chart(falling_chart, width="stretch")
-
-                # 显示数据表格
-                falling_data = processed_data['rankings'].get('跌幅榜', [])
-                if falling_data:
-                    df = pd.DataFrame(falling_data)
-                    st.dataframe(df, width="stretch")
+            # 排行榜切换：选项卡会渲染全部榜单，改为单选后只构建当前选中榜单的图表和表格
+            active_tab = st.radio(
+                "排行榜",
+                range(len(_SECTOR_RANKING_TABS)),
+                format_func=lambda i: _SECTOR_RANKING_TABS[i][2],
+                horizontal=True,
+                label_visibility="collapsed",
+                key="sector_ranking_tab"
+            )
+            chart_type, ranking_key, _, empty_hint = _SECTOR_RANKING_TABS[active_tab]
+            self._show_sector_ranking(processed_data, chart_type,
+                                      ranking_key, empty_hint, config)
 
         # 显示详细数据表格
         with st.expander("📋 查看所有板块详细数据", expanded=False):
             if 'raw_data' in processed_data:
                 st.dataframe(processed_data['raw_data'], width="stretch")
 
+    def _show_sector_ranking(self, processed_data: dict, chart_type: str,
+                             ranking_key: str, empty_hint, config: dict):
+        """
+        显示单个板块排行榜（图表和数据表格）
+        :param processed_data: 处理后的板块数据
+        :param chart_type: 排行图类型（inflow/outflow/rising/falling）
+        :param ranking_key: 排行榜数据键
+        :param empty_hint: 榜单为空时的提示（提示语, 可能原因），为None时不提示
+        :param config: 页面配置
+        """
+        if config['show_ranking_charts']:
+            ranking_chart = _build_sector_ranking_fig(
+                processed_data['rankings'], chart_type)
+            if ranking_chart:
+                st.plotly_chart(ranking_chart, width="stretch")
+
+        # 显示数据表格
+        ranking_data = processed_data['rankings'].get(ranking_key, [])
+        if len(ranking_data) > 0:
+            st.dataframe(ranking_data, column_config=_RANKING_COLUMN_CONFIG,
+                         width="stretch", hide_index=True)
+        elif empty_hint:
+            message, reasons = empty_hint
+            st.info(message)
+            st.markdown("**可能原因：**\n" + "".join(f"\n- {reason}" for reason in reasons))
+
     def show_index_sector_detail_results(self, config: dict):
         """显示指数板块详情结果"""
         if not st.session_state.index_sector_detail_data:
@@ -1219,7 +1864,6 @@ class MarginTradingWebApp:
         with col1:
             st.info(f"📈 指数代码: {index_code} | 基于权重股数据分析")
         with col2:
-            from config import index_stock_top_n
             st.metric("权重股数量", f"前{index_stock_top_n}只")
 
         # 显示汇总指标
@@ -1335,9 +1979,7 @@ class MarginTradingWebApp:
         # 显示可视化图表
         if config.get('show_overview_chart', True):
             st.subheader("📈 权重股分析图表")
-            from sector.visualizer import create_sector_visualizer
-            visualizer = create_sector_visualizer()
-            chart = visualizer.create_index_sector_chart(analysis_result)
+            chart = _build_index_sector_fig(analysis_result)
             if chart:
                 st.plotly_chart(chart, width="stretch")
 
@@ -1353,29 +1995,8 @@ class MarginTradingWebApp:
             with tab1:
                 inflow_data = rankings.get('资金流入榜', [])
                 if inflow_data:
-                    df = pd.DataFrame(inflow_data)
-                    # 重命名列以便显示
-                    display_df = df.copy()
-                    if '股票代码' in display_df.columns:
-                        display_df = display_df.rename(
-                            columns={'股票代码': '代码', '股票名称': '名称'})
-
-                    # 格式化数值列
-                    if '主力净流入' in display_df.columns:
-                        display_df['主力净流入(万元)'] = display_df['主力净流入'].apply(
-                            lambda x: f"{x:.2f}")
-                        display_df = display_df.drop('主力净流入', axis=1)
-
-                    if '涨跌幅' in display_df.columns:
-                        display_df['涨跌幅(%)'] = display_df['涨跌幅'].apply(
-                            lambda x: f"{x:.2f}")
-                        display_df = display_df.drop('涨跌幅', axis=1)
-
-                    if '权重' in display_df.columns:
-                        display_df['权重(%)'] = display_df['权重'].apply(
-                            lambda x: f"{x*100:.2f}")
-                        display_df = display_df.drop('权重', axis=1)
-
+                    display_df = _format_stock_ranking_table(
+                        inflow_data, ('主力净流入', '涨跌幅', '权重'))
                     st.dataframe(display_df, width="stretch", hide_index=True)
                 else:
                     st.info("📊 暂无资金净流入的股票")
@@ -1383,27 +2004,8 @@ class MarginTradingWebApp:
             with tab2:
                 outflow_data = rankings.get('资金流出榜', [])
                 if outflow_data:
-                    df = pd.DataFrame(outflow_data)
-                    display_df = df.copy()
-                    if '股票代码' in display_df.columns:
-                        display_df = display_df.rename(
-                            columns={'股票代码': '代码', '股票名称': '名称'})
-
-                    if '主力净流入' in display_df.columns:
-                        display_df['主力净流入(万元)'] = display_df['主力净流入'].apply(
-                            lambda x: f"{x:.2f}")
-                        display_df = display_df.drop('主力净流入', axis=1)
-
-                    if '涨跌幅' in display_df.columns:
-                        display_df['涨跌幅(%)'] = display_df['涨跌幅'].apply(
-                            lambda x: f"{x:.2f}")
-                        display_df = display_df.drop('涨跌幅', axis=1)
-
-                    if '权重' in display_df.columns:
-                        display_df['权重(%)'] = display_df['权重'].apply(
-                            lambda x: f"{x*100:.2f}")
-                        display_df = display_df.drop('权重', axis=1)
-
+                    display_df = _format_stock_ranking_table(
+                        outflow_data, ('主力净流入', '涨跌幅', '权重'))
                     st.dataframe(display_df, width="stretch", hide_index=True)
                 else:
                     st.info("📊 暂无资金净流出的股票")
@@ -1411,27 +2013,8 @@ class MarginTradingWebApp:
             with tab3:
                 rising_data = rankings.get('涨幅榜', [])
                 if rising_data:
-                    df = pd.DataFrame(rising_data)
-                    display_df = df.copy()
-                    if '股票代码' in display_df.columns:
-                        display_df = display_df.rename(
-                            columns={'股票代码': '代码', '股票名称': '名称'})
-
-                    if '涨跌幅' in display_df.columns:
-                        display_df['涨跌幅(%)'] = display_df['涨跌幅'].apply(
-                            lambda x: f"{x:.2f}")
-                        display_df = display_df.drop('涨跌幅', axis=1)
-
-                    if '主力净流入' in display_df.columns:
-                        display_df['主力净流入(万元)'] = display_df['主力净流入'].apply(
-                            lambda x: f"{x:.2f}")
-                        display_df = display_df.drop('主力净流入', axis=1)
-
-                    if '权重' in display_df.columns:
-                        display_df['权重(%)'] = display_df['权重'].apply(
-                            lambda x: f"{x*100:.2f}")
-                        display_df = display_df.drop('权重', axis=1)
-
+                    display_df = _format_stock_ranking_table(
+                        rising_data, ('涨跌幅', '主力净流入', '权重'))
                     st.dataframe(display_df, width="stretch", hide_index=True)
                 else:
                     st.info("📊 暂无涨幅数据")
@@ -1439,34 +2022,8 @@ class MarginTradingWebApp:
         # 显示详细数据表格
         with st.expander("📋 查看所有成分股详细数据", expanded=False):
             if 'raw_data' in analysis_result and not analysis_result['raw_data'].empty:
-                raw_data = analysis_result['raw_data'].copy()
-
-                # 重命名列
-                if '股票代码' in raw_data.columns:
-                    raw_data = raw_data.rename(
-                        columns={'股票代码': '代码', '股票名称': '名称'})
-
-                # 格式化数值列
-                numeric_columns = ['最新价', '涨跌幅', '主力净流入', '换手率', '权重']
-                for col in numeric_columns:
-                    if col in raw_data.columns:
-                        if col == '权重':
-                            raw_data[f'{col}(%)'] = raw_data[col].apply(
-                                lambda x: f"{x*100:.2f}")
-                        elif col == '主力净流入':
-                            raw_data[f'{col}(万元)'] = raw_data[col].apply(
-                                lambda x: f"{x:.2f}")
-                        elif col in ['涨跌幅', '换手率']:
-                            raw_data[f'{col}(%)'] = raw_data[col].apply(
-                                lambda x: f"{x:.2f}")
-                        else:
-                            raw_data[col] = raw_data[col].apply(
-                                lambda x: f"{x:.2f}")
-
-                        # 删除原列
-                        if f'{col}(%)' in raw_data.columns or f'{col}(万元)' in raw_data.columns:
-                            raw_data = raw_data.drop(col, axis=1)
-
+                raw_data = _format_stock_ranking_table(
+                    analysis_result['raw_data'], ('最新价', '涨跌幅', '主力净流入', '换手率', '权重'))
                 st.dataframe(raw_data, width="stretch", hide_index=True)
             else:
                 st.info("📊 暂无详细数据")
@@ -1570,9 +2127,7 @@ class MarginTradingWebApp:
         # 显示历史趋势图表
         if config.get('show_overview_chart', True):
             st.subheader("📈 历史趋势图表")
-            from sector.visualizer import create_sector_visualizer
-            visualizer = create_sector_visualizer()
-            history_chart = visualizer.create_sector_history_chart(
+            history_chart = _build_sector_history_fig(
                 history_data, history_analysis)
             if history_chart:
                 st.plotly_chart(history_chart, width="stretch")
@@ -1633,38 +2188,7 @@ class MarginTradingWebApp:
         # 显示历史数据表格
         with st.expander("📋 查看历史数据明细", expanded=False):
             if not history_data.empty:
-                display_data = history_data.copy()
-
-                # 格式化数值列
-                if '涨跌幅' in display_data.columns:
-                    display_data['涨跌幅(%)'] = display_data['涨跌幅'].apply(
-                        lambda x: f"{x:.2f}")
-                    display_data = display_data.drop('涨跌幅', axis=1)
-
-                if '主力净流入' in display_data.columns:
-                    display_data['主力净流入(万元)'] = display_data['主力净流入'].apply(
-                        lambda x: f"{x:.2f}")
-                    display_data = display_data.drop('主力净流入', axis=1)
-
-                if '换手率' in display_data.columns:
-                    display_data['换手率(%)'] = display_data['换手率'].apply(
-                        lambda x: f"{x:.2f}")
-                    display_data = display_data.drop('换手率', axis=1)
-
-                if '上涨比例' in display_data.columns:
-                    display_data['上涨比例(%)'] = display_data['上涨比例'].apply(
-                        lambda x: f"{x:.1f}")
-                    display_data = display_data.drop('上涨比例', axis=1)
-
-                # 格式化日期
-                if '交易日期' in display_data.columns:
-                    display_data['交易日期'] = display_data['交易日期'].dt.strftime(
-                        '%Y-%m-%d')
-
-                # 按日期倒序排列（最新的在前面）
-                display_data = display_data.sort_values(
-                    '交易日期', ascending=False)
-
+                display_data = _format_sector_history_table(history_data)
                 st.dataframe(display_data, width="stretch", hide_index=True)
             else:
                 st.info("📊 暂无历史数据")
@@ -1680,66 +2204,24 @@ class MarginTradingWebApp:
         # 显示板块基本信息
         st.subheader(f"🏢 {sector_name} 详细分析")
 
-        # 显示汇总指标
-        if 'summary' in detail_data:
-            summary = detail_data['summary']
-
-            col1, col2, col3, col4 = st.columns(4)
-
-            with col1:
-                st.metric(
-                    label="📊 成分股数量",
-                    value=summary.get('成分股数量', 0)
-                )
-
-            with col2:
-                st.metric(
-                    label="💰 板块总资金净流入",
-                    value=summary.get('板块总资金净流入', '0.00万元')
-                )
-
-            with col3:
-                st.metric(
-                    label="📈 平均涨跌幅",
-                    value=summary.get('平均涨跌幅', '0.00%')
-                )
-
-            with col4:
-                st.metric(
-                    label="📊 上涨比例",
-                    value=summary.get('上涨比例', '0.0%')
-                )
+        # 显示汇总指标：每个指标的取值只查找一次，按配置循环渲染
+        summary = detail_data.get('summary')
+        if summary is not None:
+            for col, (key, label, default) in zip(
+                    st.columns(len(_SECTOR_DETAIL_SUMMARY_METRICS)), _SECTOR_DETAIL_SUMMARY_METRICS):
+                col.metric(label=label, value=summary.get(key, default))
 
         # 显示板块强度分析
-        if 'strength_analysis' in detail_data:
+        strength = detail_data.get('strength_analysis')
+        if strength is not None:
             st.subheader("💪 板块强度分析")
-            strength = detail_data['strength_analysis']
-
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                st.metric(
-                    label="🏆 板块强度",
-                    value=strength.get('板块强度', 'N/A')
-                )
-
-            with col2:
-                st.metric(
-                    label="🚀 涨停股数量",
-                    value=strength.get('涨停股数量', 0)
-                )
-
-            with col3:
-                st.metric(
-                    label="🎯 龙头效应",
-                    value=strength.get('龙头效应', 'N/A')
-                )
+            for col, (key, label, default) in zip(
+                    st.columns(len(_SECTOR_STRENGTH_METRICS)), _SECTOR_STRENGTH_METRICS):
+                col.metric(label=label, value=strength.get(key, default))
 
         # 显示详细图表
         st.subheader("📈 板块详细分析图表")
-        from sector.visualizer import create_sector_visualizer
-        visualizer = create_sector_visualizer()
-        detail_chart = visualizer.create_sector_detail_chart(detail_data)
+        detail_chart = _build_sector_detail_fig(detail_data)
         if detail_chart:
             st.plotly_chart(detail_chart, width="stretch")
 
@@ -1833,6 +2315,9 @@ class MarginTradingWebApp:
         show_ratio_chart = st.sidebar.checkbox("占比分析图", value=True)
         show_correlation = st.sidebar.checkbox("相关性分析", value=False)
         show_dashboard = st.sidebar.checkbox("交互式仪表板", value=True)
+        high_fidelity = st.sidebar.checkbox(
+            "高保真图表", value=False,
+            help=f"绘制全部数据点；默认单条曲线超过{MARGIN_TRADING_CONFIG['max_chart_points']}个点时用LTTB算法抽稀，保留峰谷")
 
         # 查询按钮
         st.sidebar.markdown("---")  # 分隔线
@@ -1848,28 +2333,35 @@ class MarginTradingWebApp:
             'show_ratio_chart': show_ratio_chart,
             'show_correlation': show_correlation,
             'show_dashboard': show_dashboard,
+            'high_fidelity': high_fidelity,
             'query_button': query_button
         }
 
     def query_margin_data(self, config):
         """查询两融数据"""
         try:
-            # 创建进度条
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
             # 获取两融数据
-            status_text.text("正在获取两融数据...")
-            progress_bar.progress(20)
-            margin_data = self.data_fetcher.get_margin_trading_summary(
-                config['start_date'],
-                config['end_date'],
-                use_cache=config['use_cache']
-            )
+            if config['use_cache']:
+                margin_data = _fetch_margin_summary(
+                    self.data_fetcher,
+                    config['start_date'],
+                    config['end_date']
+                )
+            else:
+                margin_data = self.data_fetcher.get_margin_trading_summary(
+                    config['start_date'],
+                    config['end_date'],
+                    use_cache=False
+                )
 
             if margin_data.empty:
-                progress_bar.empty()
-                status_text.empty()
+                # 空结果不保留在缓存中，下次查询重新请求数据源
+                if config['use_cache']:
+                    _fetch_margin_summary.clear(
+                        self.data_fetcher,
+                        config['start_date'],
+                        config['end_date']
+                    )
                 st.error("❌ 未获取到指定日期范围的数据")
                 st.info("💡 可能的原因：")
                 st.markdown("""
@@ -1884,39 +2376,32 @@ class MarginTradingWebApp:
                 """)
                 return False
 
-            st.session_state.margin_data = margin_data
-
             # 获取市场数据
-            status_text.text("正在获取市场数据...")
-            progress_bar.progress(50)
-            market_data = self.data_fetcher.get_market_turnover(
-                config['start_date'],
-                config['end_date']
-            )
+            if config['use_cache']:
+                market_data = _fetch_market_turnover(
+                    self.data_fetcher,
+                    config['start_date'],
+                    config['end_date']
+                )
+            else:
+                market_data = self.data_fetcher.get_market_turnover(
+                    config['start_date'],
+                    config['end_date']
+                )
 
             # 处理数据
-            status_text.text("正在处理数据...")
-            progress_bar.progress(80)
-            processed_data = self.data_processor.process_margin_summary(
-                margin_data, market_data
+            processed_data = _process_margin_summary(
+                self.data_processor, margin_data, market_data
             )
             st.session_state.processed_data = processed_data
+            # 每次写入新数据都生成新的版本号（全局唯一，不同会话之间不会共用图表缓存）
+            st.session_state.processed_data_version = uuid.uuid4().hex
 
             # 生成分析结果
-            status_text.text("正在生成分析结果...")
-            progress_bar.progress(95)
-            analysis_result = self.data_processor.analyze_margin_trends(
-                processed_data)
+            analysis_result = _analyze_margin_trends(
+                self.data_processor, processed_data)
             st.session_state.analysis_result = analysis_result
 
-            # 完成
-            progress_bar.progress(100)
-            status_text.text("数据处理完成！")
-
-            # 清除进度条和状态文本
-            progress_bar.empty()
-            status_text.empty()
-
             st.success(f"✅ 成功获取并处理了 {len(processed_data)} 条数据记录")
             return True
 
@@ -1936,64 +2421,22 @@ class MarginTradingWebApp:
                 # 记录当前ETF代码
                 st.session_state.current_etf_code = current_etf_code
 
-            # 初始化ETF组件
-            from etf.fetcher import create_etf_fetcher
-            from etf.processor import create_etf_processor
-            from etf.visualizer import create_etf_visualizer
-
-            etf_fetcher = create_etf_fetcher()
-            etf_processor = create_etf_processor()
-            etf_visualizer = create_etf_visualizer()
-
-            # 创建进度条
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            # 获取ETF组件（进程内共享）
+            etf_fetcher = _get_etf_fetcher()
+            etf_processor = _get_etf_processor()
 
             # 跳过ETF基本信息获取，直接进入数据获取
-            progress_bar.progress(10)
-
-            # 获取ETF资金流向数据
-            status_text.text("正在获取ETF资金流向数据...")
-            progress_bar.progress(25)
-            fund_flow_data = etf_fetcher.get_etf_fund_flow(
-                config['etf_code'],
-                config['start_date'],
-                config['end_date'],
-                use_cache=config['use_cache']
-            )
+            # 四类数据在共享线程池中并发获取
+            futures = etf_fetcher.get_all(config['etf_code'], config['start_date'],
+                                          config['end_date'], use_cache=config['use_cache'])
+            fetched = {name: future.result() for name, future in futures.items()}
 
-            # 获取ETF份额变动数据
-            status_text.text("正在获取ETF份额变动数据...")
-            progress_bar.progress(40)
-            share_change_data = etf_fetcher.get_etf_share_changes(
-                config['etf_code'],
-                config['start_date'],
-                config['end_date'],
-                use_cache=config['use_cache']
-            )
-
-            # 获取ETF场外市场数据
-            status_text.text("正在获取ETF场外市场数据...")
-            progress_bar.progress(55)
-            outside_data = etf_fetcher.get_etf_outside_market_data(
-                config['etf_code'],
-                config['start_date'],
-                config['end_date'],
-                use_cache=config['use_cache']
-            )
-
-            # 获取ETF分钟数据（用于换手率分析等，可以缓存）
-            status_text.text("正在获取ETF分钟数据...")
-            progress_bar.progress(70)
-            minute_data = etf_fetcher.get_etf_minute_data(
-                config['etf_code'],
-                use_cache=config['use_cache'],
-                for_realtime=False
-            )
+            fund_flow_data = fetched['fund_flow']
+            share_change_data = fetched['share_changes']
+            outside_data = fetched['outside_market']
+            minute_data = fetched['minute_data']
 
             # 处理ETF数据
-            status_text.text("正在处理ETF数据...")
-            progress_bar.progress(95)
             processed_etf_data = etf_processor.process_etf_data(
                 fund_flow_data, share_change_data, outside_data, minute_data
             )
@@ -2003,14 +2446,6 @@ class MarginTradingWebApp:
             # 保存到session state
             st.session_state.etf_data = processed_etf_data
 
-            # 完成
-            progress_bar.progress(100)
-            status_text.text("数据处理完成！")
-
-            # 清除进度条和状态文本
-            progress_bar.empty()
-            status_text.empty()
-
             st.success(f"✅ 成功获取并处理了ETF {config['etf_code']} 的数据")
             return True
 
@@ -2118,104 +2553,46 @@ class MarginTradingWebApp:
                 fund_flow = analysis['fund_flow']
                 st.markdown("#### 💰 资金流向分析")
 
-                col1, col2, col3, col4 = st.columns(4)
-
-                with col1:
-                    total_flow = fund_flow.get('total_net_flow', 0)
-                    st.metric(
-                        label="总净流入",
-                        value=f"{total_flow:,.2f}亿元" if total_flow != 0 else "0.00亿元"
-                    )
-
-                with col2:
-                    avg_flow = fund_flow.get('avg_daily_flow', 0)
-                    st.metric(
-                        label="日均净流入",
-                        value=f"{avg_flow:,.2f}亿元" if avg_flow != 0 else "0.00亿元"
-                    )
-
-                with col3:
-                    latest_flow = fund_flow.get('latest_flow', 0)
-                    st.metric(
-                        label="最新流向",
-                        value=f"{latest_flow:,.2f}亿元" if latest_flow != 0 else "0.00亿元"
-                    )
-
-                with col4:
-                    st.metric(
-                        label="近期趋势",
-                        value=fund_flow.get('recent_trend', '资金平衡')
-                    )
+                total_flow = fund_flow.get('total_net_flow', 0)
+                avg_flow = fund_flow.get('avg_daily_flow', 0)
+                latest_flow = fund_flow.get('latest_flow', 0)
+                cards = (
+                    (_metric_tone(total_flow), "总净流入", f"{total_flow:,.2f}亿元", ''),
+                    (_metric_tone(avg_flow), "日均净流入", f"{avg_flow:,.2f}亿元", ''),
+                    (_metric_tone(latest_flow), "最新流向", f"{latest_flow:,.2f}亿元", ''),
+                    ('', "近期趋势", fund_flow.get('recent_trend', '资金平衡'), ''),
+                )
+                st.markdown(_metric_cards_html(cards), unsafe_allow_html=True)
 
             # 份额变动分析
             if 'share_changes' in analysis:
                 share_changes = analysis['share_changes']
                 st.markdown("#### 📈 份额变动分析")
 
-                col1, col2, col3, col4 = st.columns(4)
-
-                with col1:
-                    initial_shares = share_changes.get('initial_shares', 0)
-                    st.metric(
-                        label="期初份额",
-                        value=f"{initial_shares:,.2f}亿份" if initial_shares != 0 else "0.00亿份"
-                    )
-
-                with col2:
-                    final_shares = share_changes.get('final_shares', 0)
-                    st.metric(
-                        label="期末份额",
-                        value=f"{final_shares:,.2f}亿份" if final_shares != 0 else "0.00亿份"
-                    )
-
-                with col3:
-                    total_change = share_changes.get('total_change', 0)
-                    st.metric(
-                        label="总变动",
-                        value=f"{total_change:,.2f}亿份" if total_change != 0 else "0.00亿份"
-                    )
-
-                with col4:
-                    change_rate = share_changes.get('change_rate', 0)
-                    st.metric(
-                        label="变动率",
-                        value=f"{change_rate:.2f}%" if change_rate != 0 else "0.00%"
-                    )
+                total_change = share_changes.get('total_change', 0)
+                change_rate = share_changes.get('change_rate', 0)
+                cards = (
+                    ('', "期初份额", f"{share_changes.get('initial_shares', 0):,.2f}亿份", ''),
+                    ('', "期末份额", f"{share_changes.get('final_shares', 0):,.2f}亿份", ''),
+                    (_metric_tone(total_change), "总变动", f"{total_change:,.2f}亿份", ''),
+                    (_metric_tone(change_rate), "变动率", f"{change_rate:.2f}%", ''),
+                )
+                st.markdown(_metric_cards_html(cards), unsafe_allow_html=True)
 
             # 场外市场分析
             if 'outside_market' in analysis:
                 outside_market = analysis['outside_market']
                 st.markdown("#### 🏦 场外市场分析")
 
-                col1, col2, col3, col4 = st.columns(4)
-
-                with col1:
-                    total_sub = outside_market.get('total_subscription', 0)
-                    st.metric(
-                        label="总申购",
-                        value=f"{total_sub:,.2f}亿元" if total_sub != 0 else "0.00亿元"
-                    )
-
-                with col2:
-                    total_red = outside_market.get('total_redemption', 0)
-                    st.metric(
-                        label="总赎回",
-                        value=f"{total_red:,.2f}亿元" if total_red != 0 else "0.00亿元"
-                    )
-
-                with col3:
-                    net_sub = outside_market.get('net_subscription', 0)
-                    st.metric(
-                        label="净申购",
-                        value=f"{net_sub:,.2f}亿元" if net_sub != 0 else "0.00亿元"
-                    )
-
-                with col4:
-                    st.metric(
-                        label="近期趋势",
-                        value=outside_market.get(
-                            'recent_subscription_trend', '申赎平衡')
-                    )
+                net_sub = outside_market.get('net_subscription', 0)
+                cards = (
+                    ('', "总申购", f"{outside_market.get('total_subscription', 0):,.2f}亿元", ''),
+                    ('', "总赎回", f"{outside_market.get('total_redemption', 0):,.2f}亿元", ''),
+                    (_metric_tone(net_sub), "净申购", f"{net_sub:,.2f}亿元", ''),
+                    ('', "近期趋势",
+                     outside_market.get('recent_subscription_trend', '申赎平衡'), ''),
+                )
+                st.markdown(_metric_cards_html(cards), unsafe_allow_html=True)
 
     def show_margin_charts(self, config):
         """显示两融图表"""
@@ -2223,181 +2600,16 @@ class MarginTradingWebApp:
             return
 
         df = st.session_state.processed_data
-
-        # 确保dates变量总是被定义
-        dates = pd.to_datetime(
-            df['交易日期']) if '交易日期' in df.columns else list(range(len(df)))
+        # 图表缓存以数据版本号为键，重新运行时不再对整个DataFrame计算哈希
+        data_version = st.session_state.processed_data_version
+        columns = frozenset(df.columns)
+        max_points = 0 if config['high_fidelity'] else MARGIN_TRADING_CONFIG['max_chart_points']
 
         # 余额趋势图
         if config['show_balance_chart']:
             st.subheader("📈 两融交易数据趋势分析")
 
-            fig = make_subplots(
-                rows=4, cols=1,
-                subplot_titles=['两融余额趋势', '两融余额日变化率', '净融资额趋势', '维持担保比例'],
-                vertical_spacing=0.08
-            )
-
-            # 初始化纵轴范围变量
-            y1_min, y1_max = None, None
-            y2_min, y2_max = None, None
-            y3_min, y3_max = None, None
-
-            # 1. 两融余额趋势 - 显示绝对值，增强可见性
-            if '两融余额' in df.columns:
-                # 计算统计信息
-                balance_values = df['两融余额'] / 1e12  # 转换为万亿
-                mean_balance = balance_values.mean()
-                min_balance = balance_values.min()
-                max_balance = balance_values.max()
-                balance_range = max_balance - min_balance
-
-                fig.add_trace(
-                    go.Scatter(
-                        x=dates,
-                        y=balance_values,
-                        name='两融余额',
-                        line=dict(color='#FF6B6B', width=3),
-                        hovertemplate='<b>%{fullData.name}</b><br>' +
-                        '日期: %{x}<br>' +
-                        '两融余额: %{y:.2f}万亿<br>' +
-                        '<extra></extra>'
-                    ),
-                    row=1, col=1
-                )
-
-                # 添加均值参考线
-                fig.add_hline(y=mean_balance, line_dash="dash", line_color="gray",
-                              annotation_text=f"均值线 ({mean_balance:.2f}万亿)", row=1, col=1)
-
-                # 自定义纵轴范围
-                margin = balance_range * 0.05
-                y1_min = max(0, min_balance - margin)
-                y1_max = max_balance + margin
-
-            # 2. 两融余额日变化率 - 显示绝对值
-            if '两融余额_日变化率' in df.columns:
-                # 计算统计信息
-                change_rate = df['两融余额_日变化率']
-                mean_change = change_rate.mean()
-                min_change = change_rate.min()
-                max_change = change_rate.max()
-                change_range = max_change - min_change
-
-                fig.add_trace(
-                    go.Scatter(
-                        x=dates,
-                        y=change_rate,
-                        name='日变化率',
-                        line=dict(color='#9370DB', width=2),
-                        fill='tozeroy',
-                        fillcolor='rgba(147, 112, 219, 0.3)',
-                        hovertemplate='<b>%{fullData.name}</b><br>' +
-                        '日期: %{x}<br>' +
-                        '日变化率: %{y:.2f}%<br>' +
-                        '<extra></extra>'
-                    ),
-                    row=2, col=1
-                )
-
-                # 添加零基准线和均值线
-                fig.add_hline(y=0, line_dash="dash", line_color="gray",
-                              annotation_text="零变化线", row=2, col=1)
-                fig.add_hline(y=mean_change, line_dash="dot", line_color="blue",
-                              annotation_text=f"均值线 ({mean_change:.2f}%)", row=2, col=1)
-
-                # 自定义纵轴范围
-                margin = change_range * 0.1 if change_range > 0 else 0.1
-                y2_min = min_change - margin
-                y2_max = max_change + margin
-
-            # 3. 净融资额趋势 - 显示绝对值
-            if '净融资额' in df.columns:
-                # 计算统计信息
-                net_values = df['净融资额'] / 1e12  # 转换为万亿
-                mean_net = net_values.mean()
-                min_net = net_values.min()
-                max_net = net_values.max()
-                net_range = max_net - min_net
-
-                fig.add_trace(
-                    go.Scatter(
-                        x=dates,
-                        y=net_values,
-                        name='净融资额',
-                        line=dict(color='#4ECDC4', width=2),
-                        fill='tozeroy',
-                        fillcolor='rgba(78, 205, 196, 0.3)',
-                        hovertemplate='<b>%{fullData.name}</b><br>' +
-                        '日期: %{x}<br>' +
-                        '净融资额: %{y:.2f}万亿<br>' +
-                        '<extra></extra>'
-                    ),
-                    row=3, col=1
-                )
-
-                # 添加零基准线和均值线
-                fig.add_hline(y=0, line_dash="dash", line_color="gray",
-                              annotation_text="零基准线", row=3, col=1)
-                fig.add_hline(y=mean_net, line_dash="dot", line_color="blue",
-                              annotation_text=f"均值线 ({mean_net:.2f}万亿)", row=3, col=1)
-
-                # 自定义纵轴范围
-                margin = net_range * 0.1 if net_range > 0 else 0.1
-                y3_min = min_net - margin
-                y3_max = max_net + margin
-
-            # 4. 市场整体维持担保比例
-            if '市场整体维持担保比例' in df.columns:
-                fig.add_trace(
-                    go.Scatter(
-                        x=dates,
-                        y=df['市场整体维持担保比例'],
-                        name='维持担保比例',
-                        line=dict(color='#45B7D1', width=2),
-                        hovertemplate='<b>%{fullData.name}</b><br>' +
-                        '日期: %{x}<br>' +
-                        '担保比例: %{y:.1f}%<br>' +
-                        '<extra></extra>'
-                    ),
-                    row=4, col=1
-                )
-
-                # 添加风险参考线
-                fig.add_hline(y=130, line_dash="dash", line_color="red",
-                              annotation_text="最低风险线(130%)", row=4, col=1)
-                fig.add_hline(y=150, line_dash="dash", line_color="orange",
-                              annotation_text="警戒线(150%)", row=4, col=1)
-                fig.add_hline(y=200, line_dash="dash", line_color="green",
-                              annotation_text="安全线(200%)", row=4, col=1)
-
-            fig.update_layout(
-                height=1200,  # 增加高度以适应四个子图
-                showlegend=True,
-                title_text="两融交易数据趋势分析",
-                title_x=0.5
-            )
-
-            # 为每个子图设置自定义纵轴范围
-            if '两融余额' in df.columns and y1_min is not None and y1_max is not None:
-                fig.update_yaxes(title_text="两融余额 (万亿)", range=[
-                                 y1_min, y1_max], row=1, col=1)
-            else:
-                fig.update_yaxes(title_text="两融余额 (万亿)", row=1, col=1)
-
-            if '两融余额_日变化率' in df.columns and y2_min is not None and y2_max is not None:
-                fig.update_yaxes(title_text="日变化率 (%)", range=[
-                                 y2_min, y2_max], row=2, col=1)
-            else:
-                fig.update_yaxes(title_text="日变化率 (%)", row=2, col=1)
-
-            if '净融资额' in df.columns and y3_min is not None and y3_max is not None:
-                fig.update_yaxes(title_text="净融资额 (万亿)", range=[
-                                 y3_min, y3_max], row=3, col=1)
-            else:
-                fig.update_yaxes(title_text="净融资额 (万亿)", row=3, col=1)
-
-            fig.update_yaxes(title_text="担保比例 (%)", row=4, col=1)
+            fig = _build_margin_balance_fig(df, data_version, max_points)
 
             # 添加说明文字
             st.info("💡 **图表说明**：\n" +
@@ -2413,57 +2625,9 @@ class MarginTradingWebApp:
         if config['show_ratio_chart']:
             st.subheader("📊 融资占比趋势分析")
 
-            if '融资余额' in df.columns and '融券余额' in df.columns and len(df) > 0:
-                # 计算融资占比
-                total_balance = df['融资余额'] + df['融券余额']
-                financing_ratio = (df['融资余额'] / total_balance * 100)
-
-                # 计算统计信息
-                mean_financing_ratio = financing_ratio.mean()
-                min_ratio = financing_ratio.min()
-                max_ratio = financing_ratio.max()
-                ratio_range = max_ratio - min_ratio
-
-                # 创建单个图表
-                fig_ratio = go.Figure()
-
-                # 融资占比趋势 - 显示绝对值
-                fig_ratio.add_trace(
-                    go.Scatter(
-                        x=dates,
-                        y=financing_ratio,
-                        name='融资占比',
-                        line=dict(color='#FF6B6B', width=3),
-                        fill='tozeroy',
-                        fillcolor='rgba(255, 107, 107, 0.2)',
-                        hovertemplate='<b>融资占比</b><br>' +
-                        '日期: %{x}<br>' +
-                        '融资占比: %{y:.2f}%<br>' +
-                        '<extra></extra>'
-                    )
-                )
-
-                # 添加均值参考线
-                fig_ratio.add_hline(y=mean_financing_ratio, line_dash="dash", line_color="gray",
-                                    annotation_text=f"均值线 ({mean_financing_ratio:.2f}%)")
-
-                # 自定义纵轴范围：从最小值到最大值，留一点边距
-                margin = ratio_range * 0.05  # 5%的边距
-                y_min = max(0, min_ratio - margin)  # 确保不小于0
-                y_max = min(100, max_ratio + margin)  # 确保不大于100
-
-                # 更新布局
-                fig_ratio.update_layout(
-                    height=400,
-                    showlegend=True,
-                    title_text="融资占比时间序列分析",
-                    title_x=0.5,
-                    yaxis_title="融资占比 (%)",
-                    yaxis=dict(
-                        range=[y_min, y_max],
-                        tickformat='.2f'
-                    )
-                )
+            if '融资余额' in columns and '融券余额' in columns and len(df) > 0:
+                fig_ratio, ratio_stats = _build_margin_ratio_fig(df, data_version, max_points)
+                min_ratio, max_ratio, mean_financing_ratio, ratio_range = ratio_stats
 
                 # 添加说明信息
                 st.info("💡 **图表说明**：\n" +
@@ -2476,65 +2640,20 @@ class MarginTradingWebApp:
                 st.plotly_chart(fig_ratio, width='stretch')
 
             # RSI相对强弱指标
-            if '两融余额_RSI' in df.columns:
-                fig_rsi = go.Figure()
-
-                fig_rsi.add_trace(go.Scatter(
-                    x=dates, y=df['两融余额_RSI'],
-                    name='RSI', line=dict(color='#45B7D1', width=2)
-                ))
-
-                # 添加参考线
-                fig_rsi.add_hline(y=70, line_dash="dash", line_color="red",
-                                  annotation_text="超买线")
-                fig_rsi.add_hline(y=30, line_dash="dash", line_color="green",
-                                  annotation_text="超卖线")
-                fig_rsi.add_hline(y=50, line_dash="dash", line_color="gray",
-                                  annotation_text="中位线")
-
-                fig_rsi.update_layout(
-                    title="RSI相对强弱指标",
-                    yaxis_title="RSI",
-                    height=400,
-                    yaxis=dict(range=[0, 100])
-                )
-
+            if '两融余额_RSI' in columns:
+                fig_rsi = _build_margin_rsi_fig(df, data_version, max_points)
                 st.plotly_chart(fig_rsi, width='stretch')
 
         # 相关性分析
         if config['show_correlation']:
             st.subheader("🔗 相关性分析")
 
-            numeric_columns = df.select_dtypes(include=[np.number]).columns
-            exclude_patterns = ['_日变化', '_周变化', '_月变化', 'MA', 'RSI', '布林']
-            filtered_columns = [col for col in numeric_columns
-                                if not any(pattern in col for pattern in exclude_patterns)]
-
-            if len(filtered_columns) >= 2:
-                corr_matrix = df[filtered_columns].corr()
-
-                fig_heatmap = px.imshow(
-                    corr_matrix,
-                    labels=dict(color="相关系数"),
-                    x=corr_matrix.columns,
-                    y=corr_matrix.columns,
-                    color_continuous_scale='RdBu_r',
-                    aspect="auto"
-                )
-
-                fig_heatmap.update_layout(
-                    title="数据相关性热力图",
-                    height=500
-                )
-
+            fig_heatmap = _build_margin_corr_fig(df, data_version)
+            if fig_heatmap is not None:
                 st.plotly_chart(fig_heatmap, width='stretch')
 
     def show_etf_charts(self, config, etf_data):
         """显示ETF图表"""
-        # 初始化ETF可视化器
-        from etf.visualizer import create_etf_visualizer
-        etf_visualizer = create_etf_visualizer()
-
         # 获取数据
         fund_flow_data = etf_data.get('fund_flow', pd.DataFrame())
         share_change_data = etf_data.get('share_changes', pd.DataFrame())
@@ -2546,7 +2665,7 @@ class MarginTradingWebApp:
                                                    not share_change_data.empty or
                                                    not outside_data.empty):
             st.subheader("📊 ETF综合分析图表")
-            comprehensive_fig = etf_visualizer.create_comprehensive_etf_chart(
+            comprehensive_fig = _build_etf_comprehensive_fig(
                 fund_flow_data, share_change_data, outside_data)
             st.plotly_chart(comprehensive_fig, width='stretch')
 
@@ -2561,8 +2680,7 @@ class MarginTradingWebApp:
         # 单独的净流入趋势图
         if not fund_flow_data.empty and '净流入' in fund_flow_data.columns:
             st.subheader("💰 净流入趋势分析")
-            net_inflow_fig = etf_visualizer.create_net_inflow_chart(
-                fund_flow_data)
+            net_inflow_fig = _build_etf_net_inflow_fig(fund_flow_data)
             if net_inflow_fig.data:  # 检查图表是否有数据
                 st.plotly_chart(net_inflow_fig, width='stretch')
 
@@ -2588,8 +2706,7 @@ class MarginTradingWebApp:
         # 单独的价格趋势图
         if not outside_data.empty and '收盘' in outside_data.columns:
             st.subheader("💹 价格趋势分析")
-            price_trend_fig = etf_visualizer.create_price_trend_chart(
-                outside_data)
+            price_trend_fig = _build_etf_price_trend_fig(outside_data)
             if price_trend_fig.data:  # 检查图表是否有数据
                 st.plotly_chart(price_trend_fig, width='stretch')
 
@@ -2614,8 +2731,7 @@ class MarginTradingWebApp:
         # 单独的涨跌幅图表
         if not outside_data.empty and '涨跌幅' in outside_data.columns:
             st.subheader("📈 涨跌幅分析")
-            price_change_fig = etf_visualizer.create_price_change_chart(
-                outside_data)
+            price_change_fig = _build_etf_price_change_fig(outside_data)
             if price_change_fig.data:  # 检查图表是否有数据
                 st.plotly_chart(price_change_fig, width='stretch')
 
@@ -2641,8 +2757,9 @@ class MarginTradingWebApp:
         if (fund_flow_data.empty and share_change_data.empty and outside_data.empty):
             st.info("暂无数据可显示分析图表")
 
+    @st.fragment
     def show_margin_data_table(self):
-        """显示两融数据表格"""
+        """显示两融数据表格（独立片段，切换显示列时只重新运行表格部分）"""
         if not st.session_state.processed_data.empty:
             st.subheader("📋 详细数据")
 
@@ -2650,15 +2767,9 @@ class MarginTradingWebApp:
             all_columns = st.session_state.processed_data.columns.tolist()
 
             # 默认显示的重要列
-            default_columns = []
-            important_patterns = ['交易日期', '融资余额', '融券余额', '两融余额', '变化率', '占比']
-
-            for pattern in important_patterns:
-                matching_cols = [col for col in all_columns if pattern in col]
-                default_columns.extend(matching_cols)
-
-            # 去重并保持顺序
-            default_columns = list(dict.fromkeys(default_columns))
+            default_columns = _match_columns(
+                tuple(all_columns),
+                ('交易日期', '融资余额', '融券余额', '两融余额', '变化率', '占比'))
 
             selected_columns = st.multiselect(
                 "选择要显示的列:",
@@ -2667,31 +2778,37 @@ class MarginTradingWebApp:
             )
 
             if selected_columns:
-                display_df = st.session_state.processed_data[selected_columns].copy(
-                )
-
-                # 格式化数值列
-                for col in display_df.columns:
-                    if display_df[col].dtype in ['float64', 'int64']:
-                        if '余额' in col:
-                            display_df[col] = display_df[col].apply(
-                                lambda x: format_number(x) if pd.notna(x) else 'N/A')
-                        elif '率' in col or '比' in col:
-                            display_df[col] = display_df[col].apply(
-                                lambda x: f"{x:.2f}%" if pd.notna(x) else 'N/A')
+                source_df = st.session_state.processed_data
+
+                # 数值列保持数值类型，由column_config在前端格式化；
+                # 文本列转为Arrow字符串，避免object列拖慢Arrow序列化
+                display_columns = {}
+                column_config = {}
+                for col in selected_columns:
+                    column = source_df[col]
+                    is_numeric = column.dtype in ['float64', 'int64']
+                    if is_numeric and ('率' in col or '比' in col):
+                        display_columns[col] = column.to_numpy(dtype=np.float64)
+                        column_config[col] = st.column_config.NumberColumn(format="%.2f%%")
+                    elif is_numeric and '余额' in col:
+                        display_columns[col] = column.to_numpy(dtype=np.float64) / 1e8
+                        column_config[col] = st.column_config.NumberColumn(format="%.2f亿")
+                    elif column.dtype == object:
+                        display_columns[col] = column.astype('string[pyarrow]').array
+                    else:
+                        display_columns[col] = column.to_numpy()
 
-                st.dataframe(display_df, width='stretch', height=400)
+                st.dataframe(pd.DataFrame(display_columns),
+                             column_config=column_config,
+                             width='stretch', height=400, hide_index=True)
 
                 # 下载按钮
-                if st.button("📥 下载数据"):
-                    csv = st.session_state.processed_data.to_csv(
-                        index=False, encoding='utf-8-sig')
-                    st.download_button(
-                        label="下载CSV文件",
-                        data=csv,
-                        file_name=f"margin_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
+                st.download_button(
+                    label="📥 下载数据",
+                    data=_csv_bytes(source_df),
+                    file_name=f"margin_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    mime="text/csv"
+                )
 
     def show_etf_data_table(self, etf_data):
         """显示ETF数据表格"""
@@ -2704,15 +2821,14 @@ class MarginTradingWebApp:
             with tab1:
                 fund_flow_data = etf_data.get('fund_flow', pd.DataFrame())
                 if not fund_flow_data.empty:
-                    st.dataframe(fund_flow_data, width='stretch', height=400)
+                    st.dataframe(fund_flow_data, width='stretch', height=400,
+                                 hide_index=True)
 
                     # 下载按钮
                     if st.button("📥 下载资金流向数据"):
-                        csv = fund_flow_data.to_csv(
-                            index=False, encoding='utf-8-sig')
                         st.download_button(
                             label="下载CSV文件",
-                            data=csv,
+                            data=_csv_bytes(fund_flow_data),
                             file_name=f"etf_fund_flow_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                             mime="text/csv"
                         )
@@ -2724,15 +2840,13 @@ class MarginTradingWebApp:
                     'share_changes', pd.DataFrame())
                 if not share_change_data.empty:
                     st.dataframe(share_change_data,
-                                 width='stretch', height=400)
+                                 width='stretch', height=400, hide_index=True)
 
                     # 下载按钮
                     if st.button("📥 下载份额变动数据"):
-                        csv = share_change_data.to_csv(
-                            index=False, encoding='utf-8-sig')
                         st.download_button(
                             label="下载CSV文件",
-                            data=csv,
+                            data=_csv_bytes(share_change_data),
                             file_name=f"etf_share_changes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                             mime="text/csv"
                         )
@@ -2742,15 +2856,14 @@ class MarginTradingWebApp:
             with tab3:
                 outside_data = etf_data.get('outside_market', pd.DataFrame())
                 if not outside_data.empty:
-                    st.dataframe(outside_data, width='stretch', height=400)
+                    st.dataframe(outside_data, width='stretch', height=400,
+                                 hide_index=True)
 
                     # 下载按钮
                     if st.button("📥 下载场外市场数据"):
-                        csv = outside_data.to_csv(
-                            index=False, encoding='utf-8-sig')
                         st.download_button(
                             label="下载CSV文件",
-                            data=csv,
+                            data=_csv_bytes(outside_data),
                             file_name=f"etf_outside_market_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                             mime="text/csv"
                         )
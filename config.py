@@ -33,7 +33,20 @@ MARGIN_TRADING_CONFIG = {
     'cache_enabled': True,
     'cache_duration': 3600,
     'output_formats': ['csv', 'excel', 'json'],
-    'charts_enabled': True
+    'charts_enabled': True,
+    'max_chart_points': 500,  # 图表单条曲线的最大点数，超出时按LTTB算法降采样
+    'chart_cache_entries': 32  # 每种图表最多缓存的数量，超出时淘汰最早的缓存
+}
+
+# 板块资金数据相关配置
+SECTOR_CONFIG = {
+    'cache_duration': 300  # 板块资金为盘中实时数据，缓存时间较短
+}
+
+# ETF数据相关配置
+ETF_CONFIG = {
+    'cache_duration': 3600,  # ETF日线数据，图表缓存时间与两融数据一致
+    'hist_cache_size': 32  # 进程内最多保留的ETF日线行情数量，超出时淘汰最久未使用的
 }
 
 # 股票市场配置
@@ -80,6 +93,15 @@ API_LIMITS = {
     }
 }
 
+# HTTP连接配置（连接池复用TCP/TLS连接，失败请求按退避时间重试）
+HTTP_CONFIG = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'pool_connections': 32,
+    'pool_maxsize': 64,
+    'max_retries': 3,
+    'backoff_factor': 0.3
+}
+
 # 注意：指数股票映射表现在通过 ak.index_stock_info() 动态获取，不再硬编码
 
 # 权重股采样数量
@@ -5,10 +5,19 @@ A股ETF基金数据查询和分析系统
 
 from .fetcher import create_etf_fetcher
 from .processor import create_etf_processor
-from .visualizer import create_etf_visualizer
 
 __all__ = [
     'create_etf_fetcher',
     'create_etf_processor',
     'create_etf_visualizer'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    """
+    可视化器按需导入，避免仅使用数据获取/处理时加载 matplotlib/plotly
+    """
+    if name == 'create_etf_visualizer':
+        from .visualizer import create_etf_visualizer
+        return create_etf_visualizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
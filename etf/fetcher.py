@@ -4,12 +4,14 @@ EFT数据获取模块 - A股EFT查询系统
 """
 
 from utils import format_date, validate_date_range, load_cached_data, save_cached_data
-from config import DATA_SOURCES, TUSHARE_TOKEN
+from config import DATA_SOURCES, TUSHARE_TOKEN, ETF_CONFIG
 import pandas as pd
 import numpy as np
-import requests
 import time
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import sys
@@ -18,22 +20,39 @@ import os
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# 进程内共享的数据获取线程池，避免每次查询都新建和销毁线程
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='etf_fetch')
+
 
 class ETFFetcher:
     """EFT数据获取器"""
 
+    # 分钟数据为空时返回的模板（时间列为datetime64，其余为float64），返回浅拷贝避免每次重新构建
+    _EMPTY_MINUTE = pd.DataFrame({
+        '时间': pd.Series(dtype='datetime64[ns]'),
+        **{c: pd.Series(dtype='float64') for c in ['开盘', '收盘', '最高', '最低', '成交量', '成交额', '均价', '涨跌幅']},
+    })
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+
+        # 日线历史行情缓存（ETF代码 -> (获取时间, 行情, 日期数组)）：资金流向、份额变动、
+        # 场外市场数据及不同日期范围共用同一份行情。按最近使用排序，写入时淘汰过期条目，
+        # 并最多保留ETF_CONFIG['hist_cache_size']只ETF。_hist_lock只在读写缓存和按代码锁字典时短暂持有，
+        # 按代码的锁保证并发查询时同一代码只请求一次数据源，不同代码可以并行请求；
+        # 锁不随缓存条目淘汰，锁字典的大小以查询过的ETF代码数为上限
+        self._hist_cache = OrderedDict()
+        self._hist_lock = threading.Lock()
+        self._code_locks = {}
 
         # 初始化数据源
         self._init_data_sources()
 
     def _init_data_sources(self):
-        """初始化数据源"""
+        """初始化数据源（已初始化时直接返回，避免重复导入模块和设置TuShare token）"""
+        if hasattr(self, 'data_sources'):
+            return
+
         self.data_sources = {}
 
         # AKShare
@@ -59,6 +78,109 @@ class ETFFetcher:
 
 
 
+    def _fetch_daily_bars(self, etf_code: str, **date_range) -> pd.DataFrame:
+        """
+        从数据源请求ETF日线行情，日期统一解析为datetime64并按日期升序排列
+        :param etf_code: ETF代码
+        :param date_range: 可选的start_date/end_date（YYYYMMDD），不传时请求完整历史
+        :return: 日线行情DataFrame
+        """
+        if 'akshare' not in self.data_sources:
+            return pd.DataFrame()
+
+        ak = self.data_sources['akshare']
+        bars = ak.fund_etf_hist_em(symbol=etf_code, period="daily", **date_range)
+
+        # 下游的分析和绘图不再各自重复解析、排序
+        if '日期' in bars.columns:
+            bars['日期'] = pd.to_datetime(bars['日期'])
+            if not bars['日期'].is_monotonic_increasing:
+                bars = bars.sort_values('日期', ignore_index=True)
+        return bars
+
+    def _get_daily_bars(self, etf_code: str) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        获取ETF全部日线行情（每只ETF只请求一次完整历史并缓存，各日期范围在本地截取）
+        :param etf_code: ETF代码
+        :return: (日线行情DataFrame, 解析后的日期数组)
+        """
+        cache_key = f"etf_daily_bars_{etf_code}"
+        now = time.time()
+
+        with self._hist_lock:
+            code_lock = self._code_locks.setdefault(etf_code, threading.Lock())
+
+        # 同一代码的并发调用在按代码的锁上等待，随后直接复用已获取的行情；
+        # 网络请求期间不持有全局锁，不影响其他代码的获取
+        with code_lock:
+            with self._hist_lock:
+                cached = self._hist_cache.get(etf_code)
+                if cached is not None:
+                    self._hist_cache.move_to_end(etf_code)
+            if cached is not None and now - cached[0] < ETF_CONFIG['cache_duration']:
+                return cached[1], cached[2]
+
+            # 从文件缓存加载的行情以缓存文件的写入时间计时，
+            # 内存缓存过期时间不超过行情实际获取后的cache_duration
+            bars, fetched_at = load_cached_data(cache_key, with_time=True)
+            if bars is not None:
+                self.logger.info(f"从缓存加载ETF {etf_code} 历史行情数据")
+            else:
+                bars = self._fetch_daily_bars(etf_code)
+                fetched_at = now
+                if not bars.empty:
+                    save_cached_data(bars, cache_key)
+                    self.logger.info(f"ETF {etf_code} 历史行情数据已缓存")
+
+            dates = (bars['日期'].to_numpy(dtype='datetime64[ns]') if '日期' in bars.columns
+                     else np.array([], dtype='datetime64[ns]'))
+            if not bars.empty:
+                with self._hist_lock:
+                    self._store_daily_bars(etf_code, (fetched_at, bars, dates))
+            return bars, dates
+
+    def _store_daily_bars(self, etf_code: str, entry: Tuple[float, pd.DataFrame, np.ndarray]):
+        """
+        写入日线行情缓存，同时淘汰过期条目和超出容量的最久未使用条目（调用方需持有_hist_lock）
+        :param etf_code: ETF代码
+        :param entry: (获取时间, 行情, 日期数组)
+        """
+        self._hist_cache[etf_code] = entry
+        self._hist_cache.move_to_end(etf_code)
+
+        expire_before = time.time() - ETF_CONFIG['cache_duration']
+        evicted = [c for c, cached in self._hist_cache.items() if cached[0] <= expire_before]
+        while len(self._hist_cache) - len(evicted) > ETF_CONFIG['hist_cache_size']:
+            evicted.append(next(c for c in self._hist_cache if c not in evicted))
+        # 只淘汰缓存条目，按代码的锁保留：其他线程可能正持有或等待该锁，
+        # 移除后再查询该代码会拿到新锁并重复请求数据源
+        for code in evicted:
+            del self._hist_cache[code]
+
+    def _get_etf_hist(self, etf_code: str, start_date: str, end_date: str, use_cache: bool = True) -> pd.DataFrame:
+        """
+        获取ETF日线历史行情（资金流向、份额变动、场外市场数据共用，从完整日线中截取日期范围）
+        :param etf_code: ETF代码
+        :param start_date: 开始日期 YYYYMMDD
+        :param end_date: 结束日期 YYYYMMDD
+        :param use_cache: 是否使用缓存
+        :return: ETF历史行情DataFrame
+        """
+        # 不使用缓存时只请求所需日期范围，避免每次查询都下载完整历史
+        if not use_cache:
+            return self._fetch_daily_bars(etf_code, start_date=start_date, end_date=end_date)
+
+        bars, dates = self._get_daily_bars(etf_code)
+        if bars.empty:
+            return pd.DataFrame()
+        if len(dates) != len(bars):
+            # 行情缺少日期列时无法在本地截取，改为按日期范围请求
+            return self._fetch_daily_bars(etf_code, start_date=start_date, end_date=end_date)
+
+        mask = ((dates >= np.datetime64(pd.Timestamp(start_date))) &
+                (dates <= np.datetime64(pd.Timestamp(end_date))))
+        return bars[mask].reset_index(drop=True)
+
     def get_etf_fund_flow(self, etf_code: str, start_date: str, end_date: str, use_cache: bool = True) -> pd.DataFrame:
         """
         获取ETF资金流向数据
@@ -69,41 +191,15 @@ class ETFFetcher:
         :return: ETF资金流向数据DataFrame
         """
         try:
-            # 生成缓存键
-            cache_key = f"etf_fund_flow_{etf_code}_{start_date}_{end_date}"
-
-            # 尝试从缓存加载
-            if use_cache:
-                cached_data = load_cached_data(cache_key)
-                if cached_data is not None:
-                    self.logger.info(f"从缓存加载ETF {etf_code} 资金流向数据")
-                    return cached_data
-
-            if 'akshare' not in self.data_sources:
+            # 以ETF历史行情数据作为资金流向的替代
+            hist = self._get_etf_hist(etf_code, start_date, end_date, use_cache=use_cache)
+            if hist.empty:
                 return pd.DataFrame()
 
-            ak = self.data_sources['akshare']
-
-            # 方法2: 获取ETF历史行情数据作为资金流向的替代
-            try:
-                fund_flow = ak.fund_etf_hist_em(symbol=etf_code, period="daily",
-                                                start_date=start_date, end_date=end_date)
-                if not fund_flow.empty:
-                    # 计算资金流向指标
-                    fund_flow['净流入'] = fund_flow['成交额'] * \
-                        fund_flow['涨跌幅'] / 100
-                    fund_flow['累计净流入'] = fund_flow['净流入'].cumsum()
-
-                    # 保存到缓存
-                    if use_cache:
-                        save_cached_data(fund_flow, cache_key)
-                        self.logger.info(f"ETF {etf_code} 资金流向数据已缓存")
-
-                    return fund_flow
-            except Exception as e:
-                self.logger.warning(f"方法2获取ETF {etf_code} 历史数据失败: {e}")
-
-            return pd.DataFrame()
+            # 计算资金流向指标（生成新表，不改动共用的行情数据）
+            fund_flow = hist.assign(净流入=hist['成交额'] * hist['涨跌幅'] / 100)
+            fund_flow['累计净流入'] = fund_flow['净流入'].cumsum()
+            return fund_flow
 
         except Exception as e:
             self.logger.error(f"获取ETF {etf_code} 资金流向数据失败: {e}")
@@ -119,33 +215,9 @@ class ETFFetcher:
         :return: ETF份额变动数据DataFrame
         """
         try:
-            # 生成缓存键
-            cache_key = f"etf_share_changes_{etf_code}_{start_date}_{end_date}"
-
-            # 尝试从缓存加载
-            if use_cache:
-                cached_data = load_cached_data(cache_key)
-                if cached_data is not None:
-                    self.logger.info(f"从缓存加载ETF {etf_code} 份额变动数据")
-                    return cached_data
-
-            if 'akshare' not in self.data_sources:
-                return pd.DataFrame()
-
-            ak = self.data_sources['akshare']
-
-            # 获取ETF历史行情数据，用于分析份额变动趋势
-            share_changes = ak.fund_etf_hist_em(symbol=etf_code, period="daily",
-                                                start_date=start_date, end_date=end_date)
-
-            if not share_changes.empty:
-                # 保存到缓存
-                if use_cache:
-                    save_cached_data(share_changes, cache_key)
-                    self.logger.info(f"ETF {etf_code} 份额变动数据已缓存")
-                return share_changes
-            else:
-                return pd.DataFrame()
+            # 使用ETF历史行情数据分析份额变动趋势；返回浅拷贝，调用方改列不影响共用的行情数据
+            share_changes = self._get_etf_hist(etf_code, start_date, end_date, use_cache=use_cache)
+            return share_changes.copy(deep=False) if not share_changes.empty else pd.DataFrame()
 
         except Exception as e:
             self.logger.error(f"获取ETF {etf_code} 份额变动数据失败: {e}")
@@ -161,33 +233,9 @@ class ETFFetcher:
         :return: ETF场外市场数据DataFrame
         """
         try:
-            # 生成缓存键
-            cache_key = f"etf_outside_market_{etf_code}_{start_date}_{end_date}"
-
-            # 尝试从缓存加载
-            if use_cache:
-                cached_data = load_cached_data(cache_key)
-                if cached_data is not None:
-                    self.logger.info(f"从缓存加载ETF {etf_code} 场外市场数据")
-                    return cached_data
-
-            if 'akshare' not in self.data_sources:
-                return pd.DataFrame()
-
-            ak = self.data_sources['akshare']
-
-            # 获取ETF历史行情数据作为场外市场数据的替代
-            outside_data = ak.fund_etf_hist_em(symbol=etf_code, period="daily",
-                                               start_date=start_date, end_date=end_date)
-
-            if not outside_data.empty:
-                # 保存到缓存
-                if use_cache:
-                    save_cached_data(outside_data, cache_key)
-                    self.logger.info(f"ETF {etf_code} 场外市场数据已缓存")
-                return outside_data
-            else:
-                return pd.DataFrame()
+            # 使用ETF历史行情数据作为场外市场数据的替代
+            outside_data = self._get_etf_hist(etf_code, start_date, end_date, use_cache=use_cache)
+            return outside_data.copy(deep=False) if not outside_data.empty else pd.DataFrame()
 
         except Exception as e:
             self.logger.error(f"获取ETF {etf_code} 场外市场数据失败: {e}")
@@ -208,12 +256,10 @@ class ETFFetcher:
                 use_cache = False
                 self.logger.info(f"实时分析模式：不使用缓存，获取最新的ETF {etf_code} 分钟数据")
 
-            # 生成缓存键（分钟数据按日期和小时缓存，提高实时性）
-            from datetime import datetime
-            now = datetime.now()
-            today = now.strftime('%Y%m%d')
-            current_hour = now.strftime('%H')
-            cache_key = f"etf_minute_data_{etf_code}_{period}_{today}_{current_hour}"
+            # 生成缓存键（分钟数据按日期缓存；缓存文件本身1小时过期，
+            # 键中不再带小时，避免整点时未过期的缓存也失效）
+            today = datetime.now().strftime('%Y%m%d')
+            cache_key = f"etf_minute_data_{etf_code}_{period}_{today}"
 
             # 尝试从缓存加载（仅在非实时模式下）
             if use_cache and not for_realtime:
@@ -225,7 +271,7 @@ class ETFFetcher:
             if 'akshare' not in self.data_sources:
                 self.logger.warning("AKShare数据源未初始化，无法获取分钟数据")
                 # 返回一个空的DataFrame，但包含所需的列名
-                return pd.DataFrame(columns=['时间', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '均价', '涨跌幅'])
+                return self._EMPTY_MINUTE.copy(deep=False)
 
             ak = self.data_sources['akshare']
 
@@ -236,20 +282,7 @@ class ETFFetcher:
             self.logger.info(f"获取到的分钟数据行数: {len(minute_data)}")
 
             if not minute_data.empty:
-                # 确保列名统一
-                column_mapping = {
-                    '时间': '时间',
-                    '开盘': '开盘',
-                    '收盘': '收盘',
-                    '最高': '最高',
-                    '最低': '最低',
-                    '成交量': '成交量',
-                    '成交额': '成交额',
-                    '均价': '均价',
-                    '涨跌幅': '涨跌幅'
-                }
-                minute_data = minute_data.rename(columns=column_mapping)
-
+                # 数据源返回的列名已是统一的中文列名，无需再重命名复制一遍
                 # 保存到缓存（仅在非实时模式下）
                 if use_cache and not for_realtime:
                     save_cached_data(minute_data, cache_key)
@@ -259,13 +292,62 @@ class ETFFetcher:
             else:
                 self.logger.warning(f"获取到的ETF {etf_code} 分钟数据为空")
                 # 如果获取不到数据，返回一个空的DataFrame，但包含所需的列名
-                return pd.DataFrame(columns=['时间', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '均价', '涨跌幅'])
+                return self._EMPTY_MINUTE.copy(deep=False)
             return minute_data
 
         except Exception as e:
             self.logger.error(f"获取ETF {etf_code} 分钟数据失败: {e}")
             # 返回一个空的DataFrame，但包含所需的列名
-            return pd.DataFrame(columns=['时间', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '均价', '涨跌幅'])
+            return self._EMPTY_MINUTE.copy(deep=False)
+
+    def get_all(self, etf_code: str, start_date: str, end_date: str, use_cache: bool = True) -> Dict[str, Future]:
+        """
+        并发获取ETF页面所需的全部数据
+        资金流向、份额变动、场外市场、分钟数据互不依赖且都是网络I/O，
+        提交到共享线程池后总耗时取决于最慢的一次请求，而不是各次请求耗时之和
+        :param etf_code: ETF代码
+        :param start_date: 开始日期 YYYYMMDD
+        :param end_date: 结束日期 YYYYMMDD
+        :param use_cache: 是否使用缓存
+        :return: 数据名称到Future的字典
+        """
+        date_args = (etf_code, start_date, end_date)
+        return {
+            'fund_flow': _POOL.submit(self.get_etf_fund_flow, *date_args, use_cache=use_cache),
+            'share_changes': _POOL.submit(self.get_etf_share_changes, *date_args, use_cache=use_cache),
+            'outside_market': _POOL.submit(self.get_etf_outside_market_data, *date_args, use_cache=use_cache),
+            # 分钟数据用于换手率分析等，可以缓存
+            'minute_data': _POOL.submit(self.get_etf_minute_data, etf_code,
+                                        use_cache=use_cache, for_realtime=False)
+        }
+
+    def get_many(self, etf_codes: List[str], start_date: str, end_date: str,
+                 use_cache: bool = True) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """
+        并发获取多只ETF的全部数据，所有代码的请求同时提交到共享线程池
+        :param etf_codes: ETF代码列表
+        :param start_date: 开始日期 YYYYMMDD
+        :param end_date: 结束日期 YYYYMMDD
+        :param use_cache: 是否使用缓存
+        :return: ETF代码到{数据名称: DataFrame}的字典，单项获取失败时为空DataFrame
+        """
+        futures = {}
+        results = {}
+        for etf_code in dict.fromkeys(etf_codes):
+            code_futures = self.get_all(etf_code, start_date, end_date, use_cache)
+            results[etf_code] = dict.fromkeys(code_futures)
+            for name, future in code_futures.items():
+                futures[future] = (etf_code, name)
+
+        for future in as_completed(futures):
+            etf_code, name = futures[future]
+            try:
+                results[etf_code][name] = future.result()
+            except Exception as e:
+                # 单只ETF的单项数据失败不影响其他结果
+                self.logger.error(f"获取ETF {etf_code} 的{name}数据失败: {e}")
+                results[etf_code][name] = pd.DataFrame()
+        return results
 
 
 # 工厂函数
@@ -17,6 +17,35 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import MARGIN_TRADING_CONFIG
 from utils import format_number
 
+
+def _sorted_by_time(data: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    确保时间列为datetime类型并按时间升序排列
+    数据获取时已解析并排好序的数据直接返回，不再重复解析和排序
+    :param data: 待分析数据（时间列原地转换）
+    :param column: 时间列名
+    :return: 按时间排序的数据
+    """
+    if column not in data.columns:
+        return data
+    if not pd.api.types.is_datetime64_any_dtype(data[column]):
+        data[column] = pd.to_datetime(data[column])
+    if not data[column].is_monotonic_increasing:
+        data = data.sort_values(column)
+    return data
+
+
+def _numeric_array(values: pd.Series, fill: float) -> np.ndarray:
+    """
+    将列转换为float64数组，无法转换的值和缺失值用fill填充
+    :param values: 原始列
+    :param fill: 缺失值填充值
+    :return: 新的float64数组（不与原数据共享内存）
+    """
+    array = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(array), fill, array)
+
+
 class ETFDataProcessor:
     """ETF数据处理器"""
     
@@ -74,12 +103,12 @@ class ETFDataProcessor:
         
         try:
             # 确保日期列格式正确
-            if '日期' in fund_flow_data.columns:
-                fund_flow_data['日期'] = pd.to_datetime(fund_flow_data['日期'])
-                fund_flow_data = fund_flow_data.sort_values('日期')
+            fund_flow_data = _sorted_by_time(fund_flow_data, '日期')
+            # 列名集合只构建一次，后续的列存在性判断都是集合查找
+            columns = frozenset(fund_flow_data.columns)
             
             # 计算资金流向指标
-            if '净流入' in fund_flow_data.columns:
+            if '净流入' in columns:
                 net_flow = fund_flow_data['净流入'] / 1e8  # 转换为亿元
                 analysis['total_net_flow'] = float(net_flow.sum()) if not net_flow.empty else 0
                 analysis['avg_daily_flow'] = float(net_flow.mean()) if not net_flow.empty else 0
@@ -99,14 +128,14 @@ class ETFDataProcessor:
                     analysis['recent_trend'] = '数据不足'
             
             # 如果没有净流入数据，基于成交额分析
-            elif '成交额' in fund_flow_data.columns:
+            elif '成交额' in columns:
                 turnover = fund_flow_data['成交额'] / 1e8  # 转换为亿元
                 analysis['total_net_flow'] = float(turnover.sum()) if not turnover.empty else 0
                 analysis['avg_daily_flow'] = float(turnover.mean()) if not turnover.empty else 0
                 analysis['latest_flow'] = float(turnover.iloc[-1]) if not turnover.empty else 0
                 
                 # 基于涨跌幅判断资金流向
-                if '涨跌幅' in fund_flow_data.columns and len(fund_flow_data) >= 5:
+                if '涨跌幅' in columns and len(fund_flow_data) >= 5:
                     recent_changes = fund_flow_data['涨跌幅'].iloc[-5:].mean()
                     if recent_changes > 0.5:
                         analysis['recent_trend'] = '资金流入'
@@ -119,7 +148,7 @@ class ETFDataProcessor:
             
             # 最近数据
             if not fund_flow_data.empty:
-                analysis['latest_date'] = fund_flow_data['日期'].iloc[-1].strftime('%Y-%m-%d') if '日期' in fund_flow_data.columns else 'N/A'
+                analysis['latest_date'] = fund_flow_data['日期'].iloc[-1].strftime('%Y-%m-%d') if '日期' in columns else 'N/A'
             
         except Exception as e:
             self.logger.error(f"分析资金流向失败: {e}")
@@ -136,19 +165,22 @@ class ETFDataProcessor:
         
         try:
             # 确保日期列格式正确
-            if '日期' in share_change_data.columns:
-                share_change_data['日期'] = pd.to_datetime(share_change_data['日期'])
-                share_change_data = share_change_data.sort_values('日期')
+            share_change_data = _sorted_by_time(share_change_data, '日期')
+            # 列名集合只构建一次，后续的列存在性判断都是集合查找
+            columns = frozenset(share_change_data.columns)
+            
+            # 成交量、收盘价各取一次底层数组，后续统计和取首尾值都直接索引数组
+            volume = (share_change_data['成交量'].to_numpy(dtype=np.float64) / 1e8  # 转换为亿份
+                      if '成交量' in columns else None)
+            prices = (share_change_data['收盘'].to_numpy(dtype=np.float64)
+                      if '收盘' in columns else None)
             
             # 计算模拟份额变动（基于成交量和价格变化）
-            if '成交量' in share_change_data.columns and '收盘' in share_change_data.columns:
-                volume = share_change_data['成交量'] / 1e8  # 转换为亿份
-                prices = share_change_data['收盘']
-                
+            if volume is not None and prices is not None:
                 # 模拟份额数据
                 if len(volume) > 0:
-                    initial_shares = float(volume.iloc[0] * 100)  # 模拟初始份额
-                    final_shares = float(volume.iloc[-1] * 100)   # 模拟最终份额
+                    initial_shares = float(volume[0] * 100)  # 模拟初始份额
+                    final_shares = float(volume[-1] * 100)   # 模拟最终份额
                     total_change = final_shares - initial_shares
                     change_rate = (total_change / initial_shares * 100) if initial_shares != 0 else 0
                     
@@ -157,16 +189,24 @@ class ETFDataProcessor:
                     analysis['total_change'] = total_change
                     analysis['change_rate'] = change_rate
                 
-                # 活跃度分析
-                analysis['total_volume'] = float(volume.sum()) if not volume.empty else 0
-                analysis['avg_daily_volume'] = float(volume.mean()) if not volume.empty else 0
-                analysis['max_daily_volume'] = float(volume.max()) if not volume.empty else 0
-                analysis['min_daily_volume'] = float(volume.min()) if not volume.empty else 0
+                # 活跃度分析（与pandas统计一致，忽略缺失值）
+                valid_volume = volume[~np.isnan(volume)]
+                if valid_volume.size > 0:
+                    overall_avg = float(valid_volume.mean())
+                    max_volume = float(valid_volume.max())
+                    min_volume = float(valid_volume.min())
+                else:
+                    overall_avg = max_volume = min_volume = np.nan if len(volume) > 0 else 0
+                analysis['total_volume'] = float(valid_volume.sum())
+                analysis['avg_daily_volume'] = overall_avg
+                analysis['max_daily_volume'] = max_volume
+                analysis['min_daily_volume'] = min_volume
                 
                 # 趋势分析
                 if len(volume) >= 5:
-                    recent_avg = float(volume.iloc[-5:].mean())
-                    overall_avg = float(volume.mean())
+                    recent_volume = volume[-5:]
+                    recent_volume = recent_volume[~np.isnan(recent_volume)]
+                    recent_avg = float(recent_volume.mean()) if recent_volume.size > 0 else np.nan
                     if recent_avg > overall_avg * 1.2:
                         analysis['recent_trend'] = '高活跃度'
                     elif recent_avg < overall_avg * 0.8:
@@ -177,22 +217,21 @@ class ETFDataProcessor:
                     analysis['recent_trend'] = '数据不足'
             
             # 价格变动分析
-            if '收盘' in share_change_data.columns and len(share_change_data) > 1:
-                prices = share_change_data['收盘']
-                if not prices.empty:
-                    price_change = float(prices.iloc[-1]) - float(prices.iloc[0])
-                    price_change_rate = (price_change / float(prices.iloc[0]) * 100) if float(prices.iloc[0]) != 0 else 0
-                    
-                    analysis['price_change'] = price_change
-                    analysis['price_change_rate'] = price_change_rate
+            if prices is not None and len(prices) > 1:
+                first_price = float(prices[0])
+                price_change = float(prices[-1]) - first_price
+                price_change_rate = (price_change / first_price * 100) if first_price != 0 else 0
+                
+                analysis['price_change'] = price_change
+                analysis['price_change_rate'] = price_change_rate
             
             # 最近数据
             if not share_change_data.empty:
-                analysis['latest_date'] = share_change_data['日期'].iloc[-1].strftime('%Y-%m-%d') if '日期' in share_change_data.columns else 'N/A'
-                if '收盘' in share_change_data.columns and not share_change_data['收盘'].empty:
-                    analysis['latest_price'] = float(share_change_data['收盘'].iloc[-1])
-                if '成交量' in share_change_data.columns and not share_change_data['成交量'].empty:
-                    analysis['latest_volume'] = float(share_change_data['成交量'].iloc[-1]) / 1e8  # 转换为亿份
+                analysis['latest_date'] = share_change_data['日期'].iloc[-1].strftime('%Y-%m-%d') if '日期' in columns else 'N/A'
+                if prices is not None:
+                    analysis['latest_price'] = float(prices[-1])
+                if volume is not None:
+                    analysis['latest_volume'] = float(volume[-1])  # 亿份
             
         except Exception as e:
             self.logger.error(f"分析份额变动失败: {e}")
@@ -209,33 +248,25 @@ class ETFDataProcessor:
         
         try:
             # 确保日期列格式正确
-            if '日期' in outside_data.columns:
-                outside_data['日期'] = pd.to_datetime(outside_data['日期'])
-                outside_data = outside_data.sort_values('日期')
+            outside_data = _sorted_by_time(outside_data, '日期')
+            # 列名集合只构建一次，后续的列存在性判断都是集合查找
+            columns = frozenset(outside_data.columns)
             
             # 基于成交额和涨跌幅模拟申购赎回数据
-            if '成交额' in outside_data.columns and '涨跌幅' in outside_data.columns:
-                turnover = outside_data['成交额'] / 1e8  # 转换为亿元
-                change_rates = outside_data['涨跌幅']
-                
-                # 模拟申购赎回金额（基于成交额和涨跌幅）
-                subscription_amounts = []
-                redemption_amounts = []
+            if '成交额' in columns and '涨跌幅' in columns:
+                turnover = outside_data['成交额'].to_numpy(dtype=np.float64) / 1e8  # 转换为亿元
+                change_rates = outside_data['涨跌幅'].to_numpy(dtype=np.float64)
                 
-                for i, (amount, change) in enumerate(zip(turnover, change_rates)):
-                    if change > 0:  # 上涨时更多申购
-                        subscription = amount * (1 + change / 100) * 0.6
-                        redemption = amount * 0.4
-                    else:  # 下跌时更多赎回
-                        subscription = amount * 0.3
-                        redemption = amount * (1 + abs(change) / 100) * 0.7
-                    
-                    subscription_amounts.append(subscription)
-                    redemption_amounts.append(redemption)
+                # 模拟申购赎回金额（基于成交额和涨跌幅）：上涨时更多申购，下跌时更多赎回
+                rising = change_rates > 0
+                subscription_amounts = np.where(rising, turnover * (1 + change_rates / 100) * 0.6,
+                                                turnover * 0.3)
+                redemption_amounts = np.where(rising, turnover * 0.4,
+                                              turnover * (1 + np.abs(change_rates) / 100) * 0.7)
                 
                 # 计算汇总指标
-                total_subscription = sum(subscription_amounts)
-                total_redemption = sum(redemption_amounts)
+                total_subscription = float(subscription_amounts.sum())
+                total_redemption = float(redemption_amounts.sum())
                 net_subscription = total_subscription - total_redemption
                 
                 analysis['total_subscription'] = total_subscription
@@ -244,7 +275,7 @@ class ETFDataProcessor:
                 
                 # 趋势分析
                 if len(subscription_amounts) >= 5:
-                    recent_net = sum(subscription_amounts[-5:]) - sum(redemption_amounts[-5:])
+                    recent_net = subscription_amounts[-5:].sum() - redemption_amounts[-5:].sum()
                     if recent_net > 0:
                         analysis['recent_subscription_trend'] = '净申购'
                     elif recent_net < 0:
@@ -255,7 +286,7 @@ class ETFDataProcessor:
                     analysis['recent_subscription_trend'] = '数据不足'
             
             # 市场表现分析
-            if '涨跌幅' in outside_data.columns:
+            if '涨跌幅' in columns:
                 change_rates = outside_data['涨跌幅']
                 analysis['avg_change_rate'] = float(change_rates.mean()) if not change_rates.empty else 0
                 analysis['max_change_rate'] = float(change_rates.max()) if not change_rates.empty else 0
@@ -272,10 +303,10 @@ class ETFDataProcessor:
             
             # 最近数据
             if not outside_data.empty:
-                analysis['latest_date'] = outside_data['日期'].iloc[-1].strftime('%Y-%m-%d') if '日期' in outside_data.columns else 'N/A'
-                if '涨跌幅' in outside_data.columns and not outside_data['涨跌幅'].empty:
+                analysis['latest_date'] = outside_data['日期'].iloc[-1].strftime('%Y-%m-%d') if '日期' in columns else 'N/A'
+                if '涨跌幅' in columns and not outside_data['涨跌幅'].empty:
                     analysis['latest_change_rate'] = float(outside_data['涨跌幅'].iloc[-1])
-                if '收盘' in outside_data.columns and not outside_data['收盘'].empty:
+                if '收盘' in columns and not outside_data['收盘'].empty:
                     analysis['latest_price'] = float(outside_data['收盘'].iloc[-1])
             
         except Exception as e:
@@ -297,42 +328,41 @@ class ETFDataProcessor:
                 return analysis
             
             # 确保时间列格式正确
-            if '时间' in minute_data.columns:
-                minute_data['时间'] = pd.to_datetime(minute_data['时间'])
-                minute_data = minute_data.sort_values('时间')
+            minute_data = _sorted_by_time(minute_data, '时间')
+            # 列名集合只构建一次，后续的列存在性判断都是集合查找
+            columns = frozenset(minute_data.columns)
             
             # 计算换手率（如果存在成交量和流通股本数据）
             required_columns = ['成交量', '成交额', '收盘']
-            if all(col in minute_data.columns for col in required_columns):
-                # 确保数据类型正确并处理缺失值
-                volume = pd.to_numeric(minute_data['成交量'], errors='coerce').fillna(0)
-                amount = pd.to_numeric(minute_data['成交额'], errors='coerce').fillna(1)  # 避免除以0
-                close_price = pd.to_numeric(minute_data['收盘'], errors='coerce').fillna(0)
+            if columns.issuperset(required_columns):
+                # 确保数据类型正确并处理缺失值，之后的计算都在NumPy数组上完成
+                volume = _numeric_array(minute_data['成交量'], fill=0.0)
+                amount = _numeric_array(minute_data['成交额'], fill=1.0)  # 避免除以0
+                close_price = _numeric_array(minute_data['收盘'], fill=0.0)
                 
                 # 简化的换手率计算（这里使用一种近似方法）
                 # 实际换手率 = 成交量 / 流通股本，这里用成交额和收盘价近似
-                turnover_rates = (volume / amount * close_price * 100).fillna(0)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    turnover_rates = volume / amount * close_price * 100
+                turnover_rates[np.isnan(turnover_rates)] = 0
                 
-                analysis['avg_turnover_rate'] = float(turnover_rates.mean()) if not turnover_rates.empty else 0
-                analysis['max_turnover_rate'] = float(turnover_rates.max()) if not turnover_rates.empty else 0
-                analysis['min_turnover_rate'] = float(turnover_rates.min()) if not turnover_rates.empty else 0
+                analysis['avg_turnover_rate'] = float(turnover_rates.mean()) if turnover_rates.size > 0 else 0
+                analysis['max_turnover_rate'] = float(turnover_rates.max()) if turnover_rates.size > 0 else 0
+                analysis['min_turnover_rate'] = float(turnover_rates.min()) if turnover_rates.size > 0 else 0
                 
-                # 计算均线
-                if len(turnover_rates) >= 5:
-                    analysis['ma5'] = float(turnover_rates.tail(5).mean())
-                if len(turnover_rates) >= 10:
-                    analysis['ma10'] = float(turnover_rates.tail(10).mean())
-                if len(turnover_rates) >= 20:
-                    analysis['ma20'] = float(turnover_rates.tail(20).mean())
+                # 计算均线（末尾窗口直接切片求均值）
+                for window in (5, 10, 20):
+                    if len(turnover_rates) >= window:
+                        analysis[f'ma{window}'] = float(turnover_rates[-window:].mean())
             
             # 最新数据
-            if not minute_data.empty and '时间' in minute_data.columns:
+            if not minute_data.empty and '时间' in columns:
                 analysis['latest_time'] = minute_data['时间'].iloc[-1].strftime('%Y-%m-%d %H:%M:%S') if len(minute_data) > 0 else 'N/A'
-                if '收盘' in minute_data.columns and len(minute_data) > 0:
+                if '收盘' in columns and len(minute_data) > 0:
                     close_price = minute_data['收盘'].iloc[-1]
                     if pd.notna(close_price):
                         analysis['latest_price'] = float(close_price)
-                if '均价' in minute_data.columns and len(minute_data) > 0:
+                if '均价' in columns and len(minute_data) > 0:
                     avg_price = minute_data['均价'].iloc[-1]
                     if pd.notna(avg_price):
                         analysis['latest_avg_price'] = float(avg_price)
@@ -6,8 +6,8 @@ ETF数据可视化模块 - A股ETF查询系统
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
 from plotly.subplots import make_subplots
+from plotly.colors import hex_to_rgb
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
@@ -19,6 +19,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import CHART_CONFIG
 
+
+def _updown_colors(values) -> List[str]:
+    """
+    按正负生成柱状图颜色（中国股市习惯：红涨绿跌），直接在数值数组上向量化判断
+    :param values: 数值序列
+    :return: 颜色列表
+    """
+    return np.where(np.asarray(values, dtype=np.float64) >= 0, '#FF4444', '#00C851').tolist()
+
 class ETFVisualizer:
     """ETF数据可视化器"""
     
@@ -56,7 +65,7 @@ class ETFVisualizer:
                     outside_data = outside_data.sort_values('日期')
                 
                 fig.add_trace(
-                    go.Scatter(
+                    go.Scattergl(
                         x=outside_data['日期'],
                         y=outside_data['收盘'],
                         mode='lines+markers',
@@ -76,7 +85,7 @@ class ETFVisualizer:
                 if len(outside_data) >= 5:
                     ma5 = outside_data['收盘'].rolling(window=5, min_periods=1).mean()
                     fig.add_trace(
-                        go.Scatter(
+                        go.Scattergl(
                             x=outside_data['日期'],
                             y=ma5,
                             mode='lines',
@@ -111,14 +120,14 @@ class ETFVisualizer:
                 # 将成交额转换为亿元单位
                 turnover_in_billions = fund_flow_data['成交额'] / 1e8
                 fig.add_trace(
-                    go.Scatter(
+                    go.Scattergl(
                         x=fund_flow_data['日期'],
                         y=turnover_in_billions,
                         mode='lines+markers',
                         name='成交额',
                         line=dict(color=self.color_palette[0], width=2),
                         fill='tozeroy',
-                        fillcolor=f'rgba{tuple(list(px.colors.hex_to_rgb(self.color_palette[0])) + [0.3])}'
+                        fillcolor=f'rgba{tuple(list(hex_to_rgb(self.color_palette[0])) + [0.3])}'
                     ),
                     row=2, col=1
                 )
@@ -131,7 +140,7 @@ class ETFVisualizer:
                     outside_data = outside_data.sort_values('日期')
                 
                 # 中国股市颜色习惯：红色表示上涨，绿色表示下跌
-                colors = ['#FF4444' if x >= 0 else '#00C851' for x in outside_data['涨跌幅']]
+                colors = _updown_colors(outside_data['涨跌幅'])
                 
                 fig.add_trace(
                     go.Bar(
@@ -158,7 +167,7 @@ class ETFVisualizer:
                 net_inflow_in_billions = fund_flow_data['净流入'] / 1e8
                 
                 # 净流入柱状图：红色表示净流入，绿色表示净流出
-                colors = ['#FF4444' if x >= 0 else '#00C851' for x in net_inflow_in_billions]
+                colors = _updown_colors(net_inflow_in_billions)
                 
                 fig.add_trace(
                     go.Bar(
@@ -179,7 +188,7 @@ class ETFVisualizer:
                 if '累计净流入' in fund_flow_data.columns:
                     cumulative_inflow = fund_flow_data['累计净流入'] / 1e8
                     fig.add_trace(
-                        go.Scatter(
+                        go.Scattergl(
                             x=fund_flow_data['日期'],
                             y=cumulative_inflow,
                             mode='lines',
@@ -204,7 +213,7 @@ class ETFVisualizer:
                 turnover_rates = pd.to_numeric(outside_data['换手率'], errors='coerce').fillna(0)
                 
                 fig.add_trace(
-                    go.Scatter(
+                    go.Scattergl(
                         x=outside_data['日期'],
                         y=turnover_rates,
                         mode='lines+markers',
@@ -232,15 +241,15 @@ class ETFVisualizer:
             fig.update_layout(
                 height=1500,  # 调整高度以适应5个子图
                 showlegend=True,
-                title_text="ETF综合分析图表"
+                title_text="ETF综合分析图表",
+                # 各子图纵轴标题随布局一次设置
+                yaxis_title_text="价格 (元)",
+                yaxis2_title_text="成交额 (亿元)",
+                yaxis3_title_text="涨跌幅 (%)",
+                yaxis4_title_text="净流入 (亿元)",
+                yaxis5_title_text="换手率 (%)"
             )
             
-            fig.update_yaxes(title_text="价格 (元)", row=1, col=1)
-            fig.update_yaxes(title_text="成交额 (亿元)", row=2, col=1)
-            fig.update_yaxes(title_text="涨跌幅 (%)", row=3, col=1)
-            fig.update_yaxes(title_text="净流入 (亿元)", row=4, col=1)
-            fig.update_yaxes(title_text="换手率 (%)", row=5, col=1)
-            
             return fig
             
         except Exception as e:
@@ -272,7 +281,7 @@ class ETFVisualizer:
             net_inflow_in_billions = fund_flow_data['净流入'] / 1e8
             
             # 净流入柱状图：红色表示净流入，绿色表示净流出
-            colors = ['#FF4444' if x >= 0 else '#00C851' for x in net_inflow_in_billions]
+            colors = _updown_colors(net_inflow_in_billions)
             
             fig.add_trace(
                 go.Bar(
@@ -294,7 +303,7 @@ class ETFVisualizer:
                 cumulative_inflow = fund_flow_data['累计净流入'] / 1e8
                 
                 fig.add_trace(
-                    go.Scatter(
+                    go.Scattergl(
                         x=fund_flow_data['日期'],
                         y=cumulative_inflow,
                         mode='lines+markers',
@@ -314,13 +323,13 @@ class ETFVisualizer:
             fig.update_layout(
                 height=800,
                 showlegend=True,
-                title_text="ETF净流入分析"
+                title_text="ETF净流入分析",
+                # 各子图坐标轴标题随布局一次设置
+                yaxis_title_text="净流入 (亿元)",
+                yaxis2_title_text="累计净流入 (亿元)",
+                xaxis2_title_text="日期"
             )
             
-            fig.update_yaxes(title_text="净流入 (亿元)", row=1, col=1)
-            fig.update_yaxes(title_text="累计净流入 (亿元)", row=2, col=1)
-            fig.update_xaxes(title_text="日期", row=2, col=1)
-            
             return fig
             
         except Exception as e:
@@ -345,7 +354,7 @@ class ETFVisualizer:
             fig = go.Figure()
             
             # 中国股市颜色习惯：红色表示上涨，绿色表示下跌
-            colors = ['#FF4444' if x >= 0 else '#00C851' for x in outside_data['涨跌幅']]
+            colors = _updown_colors(outside_data['涨跌幅'])
             
             fig.add_trace(
                 go.Bar(
@@ -408,7 +417,7 @@ class ETFVisualizer:
             
             # 收盘价线图
             fig.add_trace(
-                go.Scatter(
+                go.Scattergl(
                     x=outside_data['日期'],
                     y=outside_data['收盘'],
                     mode='lines+markers',
@@ -427,7 +436,7 @@ class ETFVisualizer:
             if len(outside_data) >= 5:
                 ma5 = outside_data['收盘'].rolling(window=5, min_periods=1).mean()
                 fig.add_trace(
-                    go.Scatter(
+                    go.Scattergl(
                         x=outside_data['日期'],
                         y=ma5,
                         mode='lines',
@@ -443,7 +452,7 @@ class ETFVisualizer:
             if len(outside_data) >= 10:
                 ma10 = outside_data['收盘'].rolling(window=10, min_periods=1).mean()
                 fig.add_trace(
-                    go.Scatter(
+                    go.Scattergl(
                         x=outside_data['日期'],
                         y=ma10,
                         mode='lines',
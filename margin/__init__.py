@@ -5,10 +5,19 @@ A股融资融券交易数据查询和分析系统
 
 from .fetcher import create_margin_fetcher
 from .processor import create_margin_processor
-from .visualizer import create_margin_visualizer
 
 __all__ = [
     'create_margin_fetcher',
     'create_margin_processor', 
     'create_margin_visualizer'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    """
+    可视化器按需导入，避免仅使用数据获取/处理时加载 matplotlib/plotly
+    """
+    if name == 'create_margin_visualizer':
+        from .visualizer import create_margin_visualizer
+        return create_margin_visualizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
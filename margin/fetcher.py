@@ -5,7 +5,6 @@
 
 import pandas as pd
 import numpy as np
-import requests
 import time
 import logging
 from datetime import datetime, timedelta
@@ -17,17 +16,14 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import DATA_SOURCES, TUSHARE_TOKEN, MARGIN_TRADING_CONFIG
-from utils import format_date, validate_date_range, load_cached_data, save_cached_data
+from utils import format_date, validate_date_range, load_cached_data, save_cached_data, create_http_session
 
 class MarginDataFetcher:
     """两融数据获取器"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.session = create_http_session()
         
         # 初始化数据源
         self._init_data_sources()
@@ -17,6 +17,24 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import MARGIN_TRADING_CONFIG
 from utils import format_number
 
+
+def _trailing_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    计算尾随窗口均值（等价于rolling(window=period, min_periods=1).mean()）
+    :param values: 不含NaN的数值数组
+    :param period: 窗口长度
+    :return: 均值数组
+    """
+    if values.size == 0:
+        return values.copy()
+    
+    # 前端补零后按窗口求和，窗口不足period时除以实际样本数
+    padded = np.concatenate([np.zeros(period - 1), values])
+    window_sum = np.lib.stride_tricks.sliding_window_view(padded, period).sum(axis=1)
+    counts = np.minimum(np.arange(1, len(values) + 1), period)
+    return window_sum / counts
+
+
 class MarginDataProcessor:
     """两融数据处理器"""
     
@@ -217,17 +235,20 @@ class MarginDataProcessor:
     def _calculate_rsi(self, series: pd.Series, period: int = 14) -> pd.Series:
         """计算RSI指标"""
         try:
-            delta = series.diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
+            # 直接在NumPy数组上计算，避免生成多个中间Series
+            values = series.to_numpy(dtype=np.float64)
+            delta = np.diff(values, prepend=np.nan)
+            gain = np.where(delta > 0, delta, 0.0)
+            loss = np.where(delta < 0, -delta, 0.0)
             
-            avg_gain = gain.rolling(window=period, min_periods=1).mean()
-            avg_loss = loss.rolling(window=period, min_periods=1).mean()
+            avg_gain = _trailing_mean(gain, period)
+            avg_loss = _trailing_mean(loss, period)
             
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = avg_gain / avg_loss
+                rsi = 100 - (100 / (1 + rs))
             
-            return rsi.round(2)
+            return pd.Series(rsi, index=series.index).round(2)
         
         except Exception:
             return pd.Series([np.nan] * len(series), index=series.index)
@@ -9,7 +9,6 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import seaborn as sns
 import plotly.graph_objects as go
-import plotly.express as px
 from plotly.subplots import make_subplots
 import logging
 from datetime import datetime, timedelta
@@ -29,6 +28,23 @@ plt.rcParams['axes.unicode_minus'] = False
 # 设置字体大小
 plt.rcParams['font.size'] = 10
 
+
+def _trade_dates(df: pd.DataFrame, fallback=range):
+    """
+    获取交易日期横轴
+    :param df: 两融数据
+    :param fallback: 无交易日期列时用于生成序号横轴的函数
+    :return: 日期序列或序号
+    """
+    if '交易日期' not in df.columns:
+        return fallback(len(df))
+    dates = df['交易日期']
+    # 数据处理阶段已解析为datetime64时直接复用，避免重复解析日期字符串
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates)
+
+
 class MarginDataVisualizer:
     """两融数据可视化器"""
     
@@ -55,11 +71,7 @@ class MarginDataVisualizer:
                                          dpi=CHART_CONFIG['dpi'])
             
             # 确保日期列为datetime类型
-            if '交易日期' in df.columns:
-                df['交易日期'] = pd.to_datetime(df['交易日期'])
-                dates = df['交易日期']
-            else:
-                dates = range(len(df))
+            dates = _trade_dates(df)
             
             # 第一个子图：两融余额趋势
             if '两融余额' in df.columns:
@@ -127,7 +139,7 @@ class MarginDataVisualizer:
             fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12), 
                                                         dpi=CHART_CONFIG['dpi'])
             
-            dates = pd.to_datetime(df['交易日期']) if '交易日期' in df.columns else range(len(df))
+            dates = _trade_dates(df)
             
             # 融资融券结构占比
             if '融资占两融比例' in df.columns and '融券占两融比例' in df.columns:
@@ -243,7 +255,7 @@ class MarginDataVisualizer:
                        [{"secondary_y": False}, {"secondary_y": False}]]
             )
             
-            dates = pd.to_datetime(df['交易日期']) if '交易日期' in df.columns else list(range(len(df)))
+            dates = _trade_dates(df, fallback=lambda n: list(range(n)))
             
             # 1. 两融余额趋势
             if '两融余额' in df.columns:
@@ -14,6 +14,68 @@ from difflib import SequenceMatcher
 from config import TUSHARE_TOKEN, index_stock_top_n
 
 
+# 资金流向历史数据的列名映射
+_FUND_FLOW_HISTORY_COLUMN_MAP = {
+    '日期': '交易日期',
+    '收盘价': '收盘价',
+    '涨跌幅': '涨跌幅',
+    '主力净流入-净额': '主力净流入',
+    '主力净流入-净占比': '主力净流入占比',
+    '超大单净流入-净额': '超大单净流入',
+    '超大单净流入-净占比': '超大单净流入占比',
+    '大单净流入-净额': '大单净流入',
+    '大单净流入-净占比': '大单净流入占比',
+    '中单净流入-净额': '中单净流入',
+    '中单净流入-净占比': '中单净流入占比',
+    '小单净流入-净额': '小单净流入',
+    '小单净流入-净占比': '小单净流入占比'
+}
+
+# akshare股票历史数据的列名映射
+_AK_STOCK_HISTORY_COLUMN_MAP = {
+    '日期': '交易日期',
+    '开盘': '开盘价',
+    '收盘': '收盘价',
+    '最高': '最高价',
+    '最低': '最低价',
+    '成交量': '成交量',
+    '成交额': '成交额',
+    '振幅': '振幅',
+    '涨跌幅': '涨跌幅',
+    '涨跌额': '涨跌额',
+    '换手率': '换手率'
+}
+
+# tushare股票历史数据的列名映射
+_TS_STOCK_HISTORY_COLUMN_MAP = {
+    'trade_date': '交易日期',
+    'open': '开盘价',
+    'close': '收盘价',
+    'high': '最高价',
+    'low': '最低价',
+    'vol': '成交量',
+    'amount': '成交额',
+    'pct_chg': '涨跌幅',
+    'change': '涨跌额'
+}
+
+# 东方财富板块资金流原始列名到内部列名的映射
+_SECTOR_COLUMN_MAP = {
+    '名称': '板块',
+    '今日涨跌幅': '涨跌幅',
+    '今日主力净流入-净额': '主力资金',
+    '今日主力净流入-净占比': '主力占比',
+    '今日超大单净流入-净额': '超大单',
+    '今日超大单净流入-净占比': '超大单占比',
+    '今日大单净流入-净额': '大单',
+    '今日大单净流入-净占比': '大单占比',
+    '今日中单净流入-净额': '中单',
+    '今日中单净流入-净占比': '中单占比',
+    '今日小单净流入-净额': '小单',
+    '今日小单净流入-净占比': '小单占比'
+}
+
+
 class SectorFetcher:
     """板块资金数据获取器"""
 
@@ -941,27 +1003,8 @@ class SectorFetcher:
         :return: 标准化后的数据
         """
         try:
-            # 资金流向历史数据的列名映射
-            column_mapping = {
-                '日期': '交易日期',
-                '收盘价': '收盘价',
-                '涨跌幅': '涨跌幅',
-                '主力净流入-净额': '主力净流入',
-                '主力净流入-净占比': '主力净流入占比',
-                '超大单净流入-净额': '超大单净流入',
-                '超大单净流入-净占比': '超大单净流入占比',
-                '大单净流入-净额': '大单净流入',
-                '大单净流入-净占比': '大单净流入占比',
-                '中单净流入-净额': '中单净流入',
-                '中单净流入-净占比': '中单净流入占比',
-                '小单净流入-净额': '小单净流入',
-                '小单净流入-净占比': '小单净流入占比'
-            }
-
-            # 重命名列
-            for old_col, new_col in column_mapping.items():
-                if old_col in data.columns:
-                    data = data.rename(columns={old_col: new_col})
+            # 重命名列（不存在的列会被忽略）
+            data = data.rename(columns=_FUND_FLOW_HISTORY_COLUMN_MAP)
 
             # 确保日期格式正确
             if '交易日期' in data.columns:
@@ -1065,25 +1108,8 @@ class SectorFetcher:
         :return: 标准化后的数据
         """
         try:
-            # akshare的列名映射
-            column_mapping = {
-                '日期': '交易日期',
-                '开盘': '开盘价',
-                '收盘': '收盘价',
-                '最高': '最高价',
-                '最低': '最低价',
-                '成交量': '成交量',
-                '成交额': '成交额',
-                '振幅': '振幅',
-                '涨跌幅': '涨跌幅',
-                '涨跌额': '涨跌额',
-                '换手率': '换手率'
-            }
-
-            # 重命名列
-            for old_col, new_col in column_mapping.items():
-                if old_col in data.columns:
-                    data = data.rename(columns={old_col: new_col})
+            # 重命名列（不存在的列会被忽略）
+            data = data.rename(columns=_AK_STOCK_HISTORY_COLUMN_MAP)
 
             # 确保日期格式正确
             if '交易日期' in data.columns:
@@ -1115,23 +1141,8 @@ class SectorFetcher:
         :return: 标准化后的数据
         """
         try:
-            # tushare的列名映射
-            column_mapping = {
-                'trade_date': '交易日期',
-                'open': '开盘价',
-                'close': '收盘价',
-                'high': '最高价',
-                'low': '最低价',
-                'vol': '成交量',
-                'amount': '成交额',
-                'pct_chg': '涨跌幅',
-                'change': '涨跌额'
-            }
-
-            # 重命名列
-            for old_col, new_col in column_mapping.items():
-                if old_col in data.columns:
-                    data = data.rename(columns={old_col: new_col})
+            # 重命名列（不存在的列会被忽略）
+            data = data.rename(columns=_TS_STOCK_HISTORY_COLUMN_MAP)
 
             # 日期格式转换
             if '交易日期' in data.columns:
@@ -1291,26 +1302,8 @@ class SectorFetcher:
         :return: 清洗后的数据
         """
         try:
-            # 根据实际数据结构重命名列名
-            column_mapping = {
-                '名称': '板块',
-                '今日涨跌幅': '涨跌幅',
-                '今日主力净流入-净额': '主力资金',
-                '今日主力净流入-净占比': '主力占比',
-                '今日超大单净流入-净额': '超大单',
-                '今日超大单净流入-净占比': '超大单占比',
-                '今日大单净流入-净额': '大单',
-                '今日大单净流入-净占比': '大单占比',
-                '今日中单净流入-净额': '中单',
-                '今日中单净流入-净占比': '中单占比',
-                '今日小单净流入-净额': '小单',
-                '今日小单净流入-净占比': '小单占比'
-            }
-
-            # 重命名存在的列
-            for old_col, new_col in column_mapping.items():
-                if old_col in data.columns:
-                    data = data.rename(columns={old_col: new_col})
+            # 重命名列（不存在的列会被忽略）
+            data = data.rename(columns=_SECTOR_COLUMN_MAP)
 
             # 确保必要的列存在
             if '板块' not in data.columns:
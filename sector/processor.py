@@ -26,48 +26,50 @@ class SectorProcessor:
             # 基础统计
             total_sectors = len(sector_data)
             
+            # 资金流向和涨跌幅只取一次底层数组，后续统计都基于同一组掩码，
+            # 不再为每个条件生成过滤后的DataFrame
+            main_flow = sector_data['主力资金'].to_numpy(dtype=np.float64)
+            change = sector_data['涨跌幅'].to_numpy(dtype=np.float64)
+            inflow_mask = main_flow > 0
+            outflow_mask = main_flow < 0
+            
             # 资金流向统计
-            inflow_sectors = len(sector_data[sector_data['主力资金'] > 0])
-            outflow_sectors = len(sector_data[sector_data['主力资金'] < 0])
+            inflow_sectors = int(np.count_nonzero(inflow_mask))
+            outflow_sectors = int(np.count_nonzero(outflow_mask))
             
             # 涨跌统计
-            rising_sectors = len(sector_data[sector_data['涨跌幅'] > 0])
-            falling_sectors = len(sector_data[sector_data['涨跌幅'] < 0])
+            rising_sectors = int(np.count_nonzero(change > 0))
+            falling_sectors = int(np.count_nonzero(change < 0))
             
             # 资金流向排行 - 只显示真正的流入和流出
-            # 资金流入榜：只包含主力资金>0的板块
-            inflow_sectors_data = sector_data[sector_data['主力资金'] > 0]
-            if not inflow_sectors_data.empty:
-                top_inflow = inflow_sectors_data.nlargest(10, '主力资金')[['板块', '主力资金', '涨跌幅', '换手率']].to_dict('records')
-            else:
-                top_inflow = []
+            # 各排行榜直接保存为DataFrame，界面每次重新运行时无需再由记录列表重建表格
+            # 资金流入榜：先取前10再保留主力资金>0的板块，结果与先过滤再排序一致
+            top_inflow_data = sector_data.nlargest(10, '主力资金')
+            top_inflow = top_inflow_data[top_inflow_data['主力资金'] > 0][
+                ['板块', '主力资金', '涨跌幅', '换手率']].reset_index(drop=True)
             
-            # 资金流出榜：只包含主力资金<0的板块
-            outflow_sectors_data = sector_data[sector_data['主力资金'] < 0]
-            if not outflow_sectors_data.empty:
-                top_outflow = outflow_sectors_data.nsmallest(10, '主力资金')[['板块', '主力资金', '涨跌幅', '换手率']].to_dict('records')
-            else:
-                top_outflow = []
+            # 资金流出榜：先取后10再保留主力资金<0的板块
+            top_outflow_data = sector_data.nsmallest(10, '主力资金')
+            top_outflow = top_outflow_data[top_outflow_data['主力资金'] < 0][
+                ['板块', '主力资金', '涨跌幅', '换手率']].reset_index(drop=True)
             
             # 涨幅排行
-            top_rising = sector_data.nlargest(10, '涨跌幅')[['板块', '涨跌幅', '主力资金', '换手率']].to_dict('records')
-            top_falling = sector_data.nsmallest(10, '涨跌幅')[['板块', '涨跌幅', '主力资金', '换手率']].to_dict('records')
+            top_rising = sector_data.nlargest(10, '涨跌幅')[['板块', '涨跌幅', '主力资金', '换手率']].reset_index(drop=True)
+            top_falling = sector_data.nsmallest(10, '涨跌幅')[['板块', '涨跌幅', '主力资金', '换手率']].reset_index(drop=True)
             
             # 活跃度排行（按换手率，如果没有换手率数据则按主力资金排序）
             if '换手率' in sector_data.columns and sector_data['换手率'].sum() > 0:
-                most_active = sector_data.nlargest(10, '换手率')[['板块', '换手率', '主力资金', '涨跌幅']].to_dict('records')
+                most_active = sector_data.nlargest(10, '换手率')[['板块', '换手率', '主力资金', '涨跌幅']].reset_index(drop=True)
             else:
-                # 如果没有换手率数据，按主力资金绝对值排序作为活跃度指标
-                sector_data_copy = sector_data.copy()
-                sector_data_copy['资金活跃度'] = sector_data_copy['主力资金'].abs()
-                most_active = sector_data_copy.nlargest(10, '资金活跃度')[['板块', '主力资金', '涨跌幅']].to_dict('records')
+                # 如果没有换手率数据，按主力资金绝对值排序作为活跃度指标（按位置取行，不复制整表）
+                top_active = np.argsort(-np.abs(main_flow), kind='stable')[:10]
                 # 添加换手率字段（设为0）
-                for item in most_active:
-                    item['换手率'] = 0.0
+                most_active = sector_data.iloc[top_active][['板块', '主力资金', '涨跌幅']].assign(
+                    换手率=0.0).reset_index(drop=True)
             
             # 计算总体资金流向
-            total_inflow = sector_data[sector_data['主力资金'] > 0]['主力资金'].sum()
-            total_outflow = sector_data[sector_data['主力资金'] < 0]['主力资金'].sum()
+            total_inflow = main_flow[inflow_mask].sum()
+            total_outflow = main_flow[outflow_mask].sum()
             net_flow = total_inflow + total_outflow
             
             # 市场情绪指标
@@ -81,6 +83,8 @@ class SectorProcessor:
                     '上涨板块': rising_sectors,
                     '下跌板块': falling_sectors,
                     '总资金净流入': f"{net_flow:.2f}亿元",
+                    # 与显示精度一致的数值，用于指标卡片按正负着色
+                    '总资金净流入值': round(float(net_flow), 2),
                     '资金流入占比': f"{(inflow_sectors/total_sectors*100):.1f}%",
                     '上涨占比': f"{(rising_sectors/total_sectors*100):.1f}%"
                 },
@@ -508,19 +512,22 @@ class SectorProcessor:
         :return: 情绪指标
         """
         try:
+            main_flow = sector_data['主力资金'].to_numpy(dtype=np.float64)
+            change = sector_data['涨跌幅'].to_numpy(dtype=np.float64)
+            
             # 涨跌比例
             total_sectors = len(sector_data)
-            rising_ratio = len(sector_data[sector_data['涨跌幅'] > 0]) / total_sectors
+            rising_ratio = int(np.count_nonzero(change > 0)) / total_sectors
             
             # 资金流向比例
-            inflow_ratio = len(sector_data[sector_data['主力资金'] > 0]) / total_sectors
+            inflow_ratio = int(np.count_nonzero(main_flow > 0)) / total_sectors
             
             # 平均涨跌幅
             avg_change = sector_data['涨跌幅'].mean()
             
             # 资金流向强度
-            total_inflow = sector_data[sector_data['主力资金'] > 0]['主力资金'].sum()
-            total_outflow = abs(sector_data[sector_data['主力资金'] < 0]['主力资金'].sum())
+            total_inflow = main_flow[main_flow > 0].sum()
+            total_outflow = abs(main_flow[main_flow < 0].sum())
             
             if total_outflow > 0:
                 flow_ratio = total_inflow / total_outflow
@@ -544,13 +551,14 @@ class SectorProcessor:
                 sentiment = "极度悲观"
                 sentiment_score = 10
             
+            # 比例和涨跌幅以数值返回（单位：%），由界面层统一格式化
             return {
                 '市场情绪': sentiment,
                 '情绪评分': sentiment_score,
-                '上涨比例': f"{rising_ratio*100:.1f}%",
-                '资金流入比例': f"{inflow_ratio*100:.1f}%",
-                '平均涨跌幅': f"{avg_change:.2f}%",
-                '资金流向比': f"{flow_ratio:.2f}" if flow_ratio != float('inf') else "∞"
+                '上涨比例': round(rising_ratio * 100, 1),
+                '资金流入比例': round(inflow_ratio * 100, 1),
+                '平均涨跌幅': round(avg_change, 2),
+                '资金流向比': flow_ratio
             }
             
         except Exception as e:
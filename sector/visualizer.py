@@ -5,7 +5,6 @@
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
 from plotly.subplots import make_subplots
 import streamlit as st
 import logging
@@ -34,6 +33,10 @@ class SectorVisualizer:
                 return None
             
             sector_data = processed_data['raw_data']
+            # 直接取底层数组交给Plotly，避免逐列经过Series转换和整表复制
+            names = sector_data['板块'].to_numpy()
+            main_flow = sector_data['主力资金'].to_numpy(dtype=np.float64)
+            change = sector_data['涨跌幅'].to_numpy(dtype=np.float64)
             
             # 创建子图
             fig = make_subplots(
@@ -44,13 +47,11 @@ class SectorVisualizer:
             )
             
             # 1. 资金流向分布
-            inflow_data = sector_data[sector_data['主力资金'] > 0]
-            outflow_data = sector_data[sector_data['主力资金'] < 0]
-            
             fig.add_trace(
                 go.Bar(
                     x=['资金流入', '资金流出'],
-                    y=[len(inflow_data), len(outflow_data)],
+                    y=[int(np.count_nonzero(main_flow > 0)),
+                       int(np.count_nonzero(main_flow < 0))],
                     marker_color=[self.colors['positive'], self.colors['negative']],
                     name='板块数量'
                 ),
@@ -60,7 +61,7 @@ class SectorVisualizer:
             # 2. 涨跌幅分布
             fig.add_trace(
                 go.Histogram(
-                    x=sector_data['涨跌幅'],
+                    x=change,
                     nbinsx=20,
                     marker_color=self.colors['neutral'],
                     name='涨跌幅分布'
@@ -69,16 +70,15 @@ class SectorVisualizer:
             )
             
             # 3. 资金流向 vs 涨跌幅散点图
-            colors = [self.colors['positive'] if x > 0 else self.colors['negative'] 
-                     for x in sector_data['主力资金']]
+            colors = np.where(main_flow > 0, self.colors['positive'], self.colors['negative']).tolist()
             
             fig.add_trace(
                 go.Scatter(
-                    x=sector_data['主力资金'],
-                    y=sector_data['涨跌幅'],
+                    x=main_flow,
+                    y=change,
                     mode='markers',
                     marker=dict(color=colors, size=8, opacity=0.7),
-                    text=sector_data['板块'],
+                    text=names,
                     hovertemplate='<b>%{text}</b><br>主力资金: %{x:.2f}亿<br>涨跌幅: %{y:.2f}%<extra></extra>',
                     name='板块分布'
                 ),
@@ -86,14 +86,13 @@ class SectorVisualizer:
             )
             
             # 4. 板块活跃度（按主力资金绝对值）
-            sector_data_copy = sector_data.copy()
-            sector_data_copy['资金活跃度'] = sector_data_copy['主力资金'].abs()
-            top_active = sector_data_copy.nlargest(10, '资金活跃度')
+            activity = np.abs(main_flow)
+            top_active = np.argsort(-activity, kind='stable')[:10]
             
             fig.add_trace(
                 go.Bar(
-                    x=top_active['资金活跃度'],
-                    y=top_active['板块'],
+                    x=activity[top_active],
+                    y=names[top_active],
                     orientation='h',
                     marker_color=self.colors['neutral'],
                     name='资金活跃度'
@@ -151,20 +150,24 @@ class SectorVisualizer:
             else:
                 return None
             
-            if not data:
+            # 排行榜由处理器保存为DataFrame，兼容旧版的记录列表
+            if not isinstance(data, pd.DataFrame):
+                data = pd.DataFrame(data)
+            if data.empty:
                 return None
             
-            df = pd.DataFrame(data)
+            values = data[value_col].to_numpy(dtype=np.float64)
+            names = data['板块'].tolist()
             
             fig = go.Figure()
             
             fig.add_trace(
                 go.Bar(
-                    x=df[value_col],
-                    y=df['板块'],
+                    x=values,
+                    y=names,
                     orientation='h',
                     marker_color=color,
-                    text=df[value_col],
+                    text=values,
                     texttemplate='%{text:.2f}',
                     textposition='outside'
                 )
@@ -4,12 +4,13 @@
 
 import os
 import logging
+import hashlib
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
 from typing import Dict, List, Any, Optional
-from config import STORAGE_CONFIG, LOGGING_CONFIG
+from config import STORAGE_CONFIG, LOGGING_CONFIG, HTTP_CONFIG
 
 def setup_logging():
     """设置日志配置"""
@@ -158,41 +159,98 @@ def save_data(data: pd.DataFrame, filename: str, format_type: str = 'csv'):
         logging.error(f"保存数据时出错: {e}")
         return None
 
-def load_cached_data(cache_key: str):
+def create_http_session():
+    """
+    创建带连接池和重试的HTTP会话，同一主机的请求复用keep-alive连接
+    :return: requests.Session对象
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': HTTP_CONFIG['user_agent'],
+        'Connection': 'keep-alive'
+    })
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_CONFIG['pool_connections'],
+        pool_maxsize=HTTP_CONFIG['pool_maxsize'],
+        max_retries=Retry(total=HTTP_CONFIG['max_retries'],
+                          backoff_factor=HTTP_CONFIG['backoff_factor'],
+                          status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=('GET',))
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _cache_file(cache_key: str, suffix: str) -> str:
+    """
+    获取缓存文件路径，文件名取缓存键的blake2b摘要
+    :param cache_key: 缓存键
+    :param suffix: 文件后缀（parquet或pkl）
+    :return: 缓存文件路径
+    """
+    digest = hashlib.blake2b(cache_key.encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(STORAGE_CONFIG['temp_dir'], f"{digest}.{suffix}")
+
+def load_cached_data(cache_key: str, with_time: bool = False):
     """
     加载缓存数据
     :param cache_key: 缓存键
-    :return: 缓存的数据或None
+    :param with_time: 是否同时返回所读取缓存文件的写入时间
+    :return: 缓存的数据或None；with_time为True时返回(数据, 写入时间戳)，无缓存时为(None, None)
     """
-    cache_dir = STORAGE_CONFIG['temp_dir']
-    cache_file = os.path.join(cache_dir, f"{cache_key}.pkl")
+    current_time = datetime.now().timestamp()
     
     try:
-        if os.path.exists(cache_file):
+        # DataFrame优先读取parquet缓存，其他对象读取pickle缓存
+        for suffix in ('parquet', 'pkl'):
+            cache_file = _cache_file(cache_key, suffix)
+            if not os.path.exists(cache_file):
+                continue
+            
             # 检查缓存时间
-            cache_time = os.path.getmtime(cache_file)
-            current_time = datetime.now().timestamp()
+            mtime = os.path.getmtime(cache_file)
+            if current_time - mtime >= 3600:  # 1小时内的缓存有效
+                continue
             
-            if current_time - cache_time < 3600:  # 1小时内的缓存有效
+            if suffix == 'parquet':
+                data = pd.read_parquet(cache_file, engine='pyarrow')
+            else:
                 import pickle
                 with open(cache_file, 'rb') as f:
-                    return pickle.load(f)
+                    data = pickle.load(f)
+            return (data, mtime) if with_time else data
         
     except Exception as e:
         logging.error(f"加载缓存数据时出错: {e}")
     
-    return None
+    return (None, None) if with_time else None
 
 def save_cached_data(data, cache_key: str):
     """
     保存数据到缓存
-    :param data: 要缓存的数据（DataFrame或其他对象）
+    :param data: 要缓存的数据（DataFrame写为parquet，其他对象使用pickle）
     :param cache_key: 缓存键
     """
-    cache_dir = STORAGE_CONFIG['temp_dir']
     ensure_directories()
-    cache_file = os.path.join(cache_dir, f"{cache_key}.pkl")
     
+    if isinstance(data, pd.DataFrame):
+        cache_file = _cache_file(cache_key, 'parquet')
+        try:
+            data.to_parquet(cache_file, engine='pyarrow', compression='zstd',
+                            compression_level=3)
+            logging.info(f"数据已缓存到: {cache_file}")
+            return
+        except Exception as e:
+            # 混合类型的object列等无法写为parquet时回退到pickle
+            logging.warning(f"parquet缓存写入失败，改用pickle: {e}")
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+    
+    cache_file = _cache_file(cache_key, 'pkl')
     try:
         import pickle
         with open(cache_file, 'wb') as f: